@@ -1,8 +1,13 @@
 from fastapi import Depends, HTTPException, Header
 from redis import Redis
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.db.redis import get_redis
 from app.core.jwt import decode_jwt_token
+from app.core.session_cache import (
+    cache_session,
+    get_cached_session,
+    session_generation,
+)
 
 
 def get_current_user(
@@ -13,16 +18,22 @@ def get_current_user(
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     token = authorization.split(" ")[1]
+    payload = get_cached_session(token)
+    if payload is not None:
+        return payload
+
     payload = decode_jwt_token(token)
     user_id = payload["sub"]
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
+    generation = session_generation(user_id)
     session_key = f"session:{user_id}"
     redis_token = redis_client.get(session_key)
     if not redis_token or redis_token.decode() != token:
         raise HTTPException(status_code=401, detail="session expired or invalid")
 
+    cache_session(token, payload, generation)
     return payload
 
 
-__all__ = ["get_db", "get_redis", "get_current_user"]
+__all__ = ["get_db", "get_async_db", "get_redis", "get_current_user"]
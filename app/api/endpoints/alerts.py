@@ -1,10 +1,8 @@
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 
+from app.core.broadcast import broadcaster
 from app.core.config import settings
-from fastapi import Request
-from app.db.redis import get_redis_sub
-import time
 
 router = APIRouter(
     prefix="/alerts",
@@ -13,35 +11,29 @@ router = APIRouter(
 )
 
 
-@router.get("/low-stock")
-async def get_low_stock_alerts():
-    def event_generator():
-        pubsub = get_redis_sub().pubsub()
-        pubsub.subscribe(settings.REDIS_LOW_INVENTORY)
+async def event_stream(channel: str):
+    subscription = await broadcaster.subscribe(channel)
+    try:
         yield 'data: {"status": "connected"}\n\n'
-        try:
-            for message in pubsub.listen():
-                if message["type"] == "message":
-                    yield f"data: {message['data'].decode('utf-8')}\n\n"
-                time.sleep(0.01)
-        finally:
-            pubsub.close()
+        while True:
+            message = await subscription.get(timeout=settings.SSE_HEARTBEAT_SECONDS)
+            if message is None:
+                yield ": heartbeat\n\n"
+                continue
+            yield f"data: {message}\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
+
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+@router.get("/low-stock")
+async def get_low_stock_alerts():
+    return StreamingResponse(
+        event_stream(settings.REDIS_LOW_INVENTORY), media_type="text/event-stream"
+    )
 
 
 @router.get("/incoming-order")
 async def incoming_order_alerts():
-    def event_generator():
-        pubsub = get_redis_sub().pubsub()
-        pubsub.subscribe(settings.REDIS_INCOMING_ORDER)
-        yield 'data: {"status": "connected"}\n\n'
-        try:
-            for message in pubsub.listen():
-                if message["type"] == "message":
-                    yield f"data: {message['data'].decode('utf-8')}\n\n"
-                time.sleep(0.01)
-        finally:
-            pubsub.close()
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return StreamingResponse(
+        event_stream(settings.REDIS_INCOMING_ORDER), media_type="text/event-stream"
+    )
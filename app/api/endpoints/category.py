@@ -1,13 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_db
+from app.api.dependencies import get_async_db
+from app.core.category_tree import (
+    CategoryTree,
+    dispatch_category_writes,
+    get_category_tree,
+)
 from app.schema.category import (
     CategoryCreate,
     Category as CategorySchema,
 )
+from app.schema.product import ProductSecondary as ProductSecondarySchema
 from app.models.category import Category as CategoryModel
+from app.models.product import Product as ProductModel
 
 
 router = APIRouter(
@@ -17,8 +25,19 @@ router = APIRouter(
 )
 
 
+def find_category(tree: CategoryTree, identifier: str) -> dict:
+    category = tree.by_identifier.get(identifier)
+    if not category:
+        raise HTTPException(
+            status_code=404, detail="unable to find category, invalid identifier"
+        )
+    return category
+
+
 @router.post("/")
-async def create_category(req: CategoryCreate, db: Session = Depends(get_db)):
+async def create_category(
+    req: CategoryCreate, db: AsyncSession = Depends(get_async_db)
+):
     category = CategoryModel(
         name=req.name,
         description=req.description,
@@ -29,14 +48,16 @@ async def create_category(req: CategoryCreate, db: Session = Depends(get_db)):
 
     try:
         db.add(category)
-        db.commit()
-        db.refresh(category)
+        await db.commit()
+        await dispatch_category_writes(db)
+        await db.refresh(category)
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         if 'unique constraint "category_identifier_key"' in str(e.orig):
             raise HTTPException(
                 status_code=400, detail="category identifier already exists"
             )
+        raise HTTPException(status_code=400, detail="Database integerity error")
 
     return {
         "message": "category added successfully",
@@ -47,40 +68,79 @@ async def create_category(req: CategoryCreate, db: Session = Depends(get_db)):
 @router.get("/{identifier}")
 async def category_details(
     identifier: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    def build_category_detail(category):
-        if not category:
-            return None
-        parent = build_category_detail(category.parent) if category.parent else None
-        cat_data = CategorySchema.model_validate(
-            category, from_attributes=True
-        ).model_dump()
-        cat_data["parent"] = parent
-        return cat_data
-
-    category = (
-        db.query(CategoryModel).filter(CategoryModel.identifier == identifier).first()
-    )
-
-    if not category:
-        raise HTTPException(
-            status_code=404, detail="unable to find category, invalid identifier"
-        )
+    tree = await get_category_tree(db)
+    category = find_category(tree, identifier)
 
     return {
         "message": "retrieved category details",
-        "data": build_category_detail(category),
+        "data": tree.with_parents(category["id"]),
     }
 
 
-@router.get("/")
-async def categories(db: Session = Depends(get_db)):
-    categories = db.query(CategoryModel).all()
+@router.get("/{identifier}/ancestors")
+async def category_ancestors(
+    identifier: str,
+    db: AsyncSession = Depends(get_async_db),
+):
+    tree = await get_category_tree(db)
+    category = find_category(tree, identifier)
 
-    data = [
-        CategorySchema.model_validate(category, from_attributes=True)
-        for category in categories
-    ]
+    return {
+        "message": "retrieved category ancestors",
+        "data": tree.ancestors(category["id"]),
+    }
+
+
+@router.get("/{identifier}/subtree")
+async def category_subtree(
+    identifier: str,
+    db: AsyncSession = Depends(get_async_db),
+):
+    tree = await get_category_tree(db)
+    category = find_category(tree, identifier)
+
+    return {
+        "message": "retrieved category subtree",
+        "data": tree.subtree(category["id"]),
+    }
+
+
+@router.get("/{identifier}/products")
+async def category_products(
+    identifier: str,
+    limit: int = 20,
+    skip: int = 0,
+    db: AsyncSession = Depends(get_async_db),
+):
+    tree = await get_category_tree(db)
+    category = find_category(tree, identifier)
+    category_ids = tree.descendant_ids(category["id"])
+
+    query = (
+        select(ProductModel, func.count().over().label("total"))
+        .where(ProductModel.category_id.in_(category_ids))
+        .order_by(ProductModel.created_at.desc(), ProductModel.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = (await db.execute(query)).all()
+
+    return {
+        "message": "retrieved category products",
+        "data": [
+            ProductSecondarySchema.model_validate(product, from_attributes=True)
+            for product, _ in rows
+        ],
+        "total": rows[0].total if rows else 0,
+        "limit": limit,
+        "skip": skip,
+    }
+
+
+@router.get("/")
+async def categories(db: AsyncSession = Depends(get_async_db)):
+    tree = await get_category_tree(db)
 
-    return {"message": "successfully fetched the categories list", "data": data}
+    return {"message": "successfully fetched the categories list", "data": tree.all()}
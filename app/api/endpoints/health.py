@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.consumer_metrics import consumer_health
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+    responses={404: {"detail": "Not found"}},
+)
+
+
+@router.get("/consumers")
+def get_consumer_health():
+    consumers = consumer_health()
+    healthy = all(consumer["healthy"] for consumer in consumers.values())
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={"healthy": healthy, "consumers": consumers},
+    )
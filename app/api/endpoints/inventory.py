@@ -1,9 +1,15 @@
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Depends, Request, Path
-from sqlalchemy.orm import Session, Query, joinedload
-from app.api.dependencies import get_current_user, get_db
+from redis.exceptions import LockError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from app.api.dependencies import get_current_user, get_async_db
+from app.core import flash_inventory
+from app.core.config import settings
 from app.models import inventory
 from app.schema.inventory import (
+    FlashReplenish,
     InventoryCreate,
     InventoryUpdate,
     Inventory as InventorySchema,
@@ -11,6 +17,7 @@ from app.schema.inventory import (
 )
 from app.models.inventory import Inventory as InventoryModel
 from app.models.inventory_history import InventoryHistory as InventoryHistoryModel
+import asyncio
 import uuid
 
 
@@ -21,17 +28,68 @@ router = APIRouter(
 )
 
 
+@router.get("/flash/drift")
+async def flash_stock_drift(user=Depends(get_current_user)):
+    try:
+        report = await asyncio.to_thread(flash_inventory.detect_drift)
+    except LockError:
+        raise HTTPException(
+            status_code=503, detail="Reconciliation in progress, please retry"
+        )
+    return {"message": "flash sale stock drift", "data": report}
+
+
+@router.post("/flash/{product_id}")
+async def enable_flash_sale(product_id: uuid.UUID, user=Depends(get_current_user)):
+    if not settings.FLASH_SALES_ENABLED:
+        raise HTTPException(
+            status_code=400, detail="Flash sales are disabled, set FLASH_SALES_ENABLED"
+        )
+    stock = await asyncio.to_thread(flash_inventory.enable_flash_mode, product_id)
+    if stock is None:
+        raise HTTPException(
+            status_code=404, detail="Inventory not found for this product"
+        )
+    return {
+        "message": "flash sale mode enabled",
+        "data": {"product_id": product_id, "quantity": stock},
+    }
+
+
+@router.delete("/flash/{product_id}")
+async def disable_flash_sale(product_id: uuid.UUID, user=Depends(get_current_user)):
+    await asyncio.to_thread(flash_inventory.disable_flash_mode, product_id)
+    return {"message": "flash sale mode disabled"}
+
+
+@router.post("/flash/{product_id}/replenish")
+async def replenish_flash_stock(
+    req: FlashReplenish, product_id: uuid.UUID, user=Depends(get_current_user)
+):
+    if not await flash_inventory.flagged_products([product_id]):
+        raise HTTPException(
+            status_code=400, detail="Product is not in flash sale mode"
+        )
+    await flash_inventory.restock(
+        {product_id: req.quantity}, user["sub"], req.change_reason
+    )
+    return {"message": "flash sale stock replenished"}
+
+
 @router.get("/{product_sku}")
 async def get_product_inventory_details(
-    product_sku: str, db: Session = Depends(get_db)
+    product_sku: str, db: AsyncSession = Depends(get_async_db)
 ):
-    inventory = (
-        db.query(InventoryModel)
+    inventory = await db.scalar(
+        select(InventoryModel)
         .join(InventoryModel.product)
-        .options(joinedload(InventoryModel.product))
-        .filter(InventoryModel.product.has(sku=product_sku))
+        .options(
+            joinedload(InventoryModel.product),
+            selectinload(InventoryModel.history),
+        )
+        .where(InventoryModel.product.has(sku=product_sku))
         .order_by(InventoryModel.created_at.desc())
-        .first()
+        .limit(1)
     )
 
     if not inventory:
@@ -49,18 +107,24 @@ async def get_product_inventory_details(
 async def update_inventory(
     req: InventoryUpdate,
     inventory_id: uuid.UUID = Path(..., description="The UUID of the product"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
-    latest_inventory = (
-        db.query(InventoryModel)
-        .filter(InventoryModel.id == inventory_id)
+    latest_inventory = await db.scalar(
+        select(InventoryModel)
+        .where(InventoryModel.id == inventory_id)
         .order_by(InventoryModel.created_at.desc())
-        .first()
+        .limit(1)
+        .with_for_update()
     )
 
     if not latest_inventory:
         raise HTTPException(status_code=404, detail="Inventory not found")
+    if await flash_inventory.flagged_products([latest_inventory.product_id]):
+        raise HTTPException(
+            status_code=409,
+            detail="Product is in flash sale mode, use the replenish endpoint",
+        )
 
     previous_quantity = latest_inventory.quantity
     latest_inventory.quantity = req.quantity
@@ -78,9 +142,10 @@ async def update_inventory(
     try:
         db.add(inventor_history)
         db.add(latest_inventory)
-        db.commit()
+        await db.commit()
+        await db.refresh(latest_inventory)
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail="Failed to update inventory and history"
         )
@@ -93,16 +158,24 @@ async def update_inventory(
 
 @router.post("/")
 async def add_inventory(
-    req: InventoryCreate, db: Session = Depends(get_db), user=Depends(get_current_user)
+    req: InventoryCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
 ):
-
-    latest_inventory = (
-        db.query(InventoryModel)
-        .filter(InventoryModel.product_id == req.product_id)
+    latest_inventory = await db.scalar(
+        select(InventoryModel)
+        .where(InventoryModel.product_id == req.product_id)
         .order_by(InventoryModel.created_at.desc())
-        .first()
+        .limit(1)
+        .with_for_update()
     )
 
+    if await flash_inventory.flagged_products([req.product_id]):
+        raise HTTPException(
+            status_code=400,
+            detail="Product is in flash sale mode, use the replenish endpoint",
+        )
+
     if latest_inventory and latest_inventory.quantity > 0:
         raise HTTPException(
             status_code=400,
@@ -125,12 +198,12 @@ async def add_inventory(
 
     try:
         db.add(inventory)
-        db.flush()
+        await db.flush()
         inventor_history.inventory_id = inventory.id
         db.add(inventor_history)
-        db.commit()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail="Failed to add inventory and history"
         )
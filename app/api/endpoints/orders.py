@@ -1,12 +1,28 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 import random
 import string
+import uuid
 
-from app.api.dependencies import get_current_user, get_db
-from app.core.kafka_producer import send_order_event, send_sales_event
-from app.schema.orders import OrderCreate, Order as OrderSchema
+from app.api.dependencies import get_current_user, get_async_db
+from app.core import flash_inventory
+from app.core.config import settings
+from app.core.kafka_producer import (
+    send_order_batch,
+    send_order_event,
+    send_sales_event,
+)
+from app.schema.orders import (
+    OrderBulkCreate,
+    OrderBulkResult,
+    OrderCreate,
+    Order as OrderSchema,
+)
 from app.models.orders import Order as OrderModel
 from app.models.orders_items import OrderItem as OrderItemModel
 from app.models.product import Product as ProductModel
@@ -14,6 +30,7 @@ from app.models.inventory import Inventory as InventoryModel
 from app.models.inventory_history import (
     InventoryHistory as InventoryHistoryModel,
 )
+from app.models.sales_channel import SalesChannel as SalesChannelModel
 
 router = APIRouter(
     prefix="/orders",
@@ -21,6 +38,9 @@ router = APIRouter(
     responses={404: {"detail": "Not found"}},
 )
 
+TAX_AMOUNT = 1.2
+SHIPPING_PER_ITEM = 0.99
+
 
 def generate_order_number() -> str:
     date_part = datetime.now().strftime("%Y%m%d")
@@ -28,76 +48,213 @@ def generate_order_number() -> str:
     return f"ORD-{date_part}-{random_part}"
 
 
+def requested_quantities(items) -> Dict[uuid.UUID, int]:
+    requested: Dict[uuid.UUID, int] = {}
+    for item in items:
+        requested[item.product_id] = requested.get(item.product_id, 0) + item.quantity
+    return requested
+
+
+def not_enough_inventory(product_id, requested: int, available: int) -> str:
+    return (
+        f"Not enough inventory for product id {product_id}. "
+        f"Requested: {requested}, Available: {available}"
+    )
+
+
+def check_order_products(
+    items, products: Dict[uuid.UUID, ProductModel]
+) -> Optional[Tuple[int, str]]:
+    """(status code, detail) for the first item whose product cannot be sold"""
+    for item in items:
+        product = products.get(item.product_id)
+        if not product:
+            return 404, f"Product with id {item.product_id} does not exist"
+        if product.status != "ACTIVE":
+            return 400, f"Product with id {item.product_id} is not active"
+    return None
+
+
+def check_order_items(
+    items, products: Dict[uuid.UUID, ProductModel], available: Dict[uuid.UUID, int]
+) -> Optional[Tuple[int, str]]:
+    """(status code, detail) for the first item that cannot be placed"""
+    error = check_order_products(items, products)
+    if error:
+        return error
+    for product_id, quantity in requested_quantities(items).items():
+        available_qty = available.get(product_id, 0)
+        if available_qty < quantity:
+            return 400, not_enough_inventory(product_id, quantity, available_qty)
+    return None
+
+
+def latest_inventory_id(product_id):
+    return (
+        select(InventoryModel.id)
+        .where(InventoryModel.product_id == product_id)
+        .order_by(InventoryModel.created_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+async def decrement_inventory(
+    db: AsyncSession, product_id, quantity: int
+) -> Optional[Tuple[uuid.UUID, int]]:
+    """
+    Take `quantity` off the latest inventory row of the product in a single
+    conditional UPDATE. Concurrent orders queue on the row lock and postgres
+    re-checks `quantity >= n` against the committed value, so stock can
+    never go negative. Returns (inventory id, new quantity), None when short.
+    """
+    query = (
+        update(InventoryModel)
+        .where(
+            InventoryModel.id == latest_inventory_id(product_id),
+            InventoryModel.quantity >= quantity,
+        )
+        .values(quantity=InventoryModel.quantity - quantity)
+        .returning(InventoryModel.id, InventoryModel.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return (await db.execute(query)).first()
+
+
+def order_amounts(items, products: Dict[uuid.UUID, ProductModel]) -> dict:
+    return {
+        "total_amount": sum(
+            products[item.product_id].price * item.quantity for item in items
+        ),
+        "tax_amount": TAX_AMOUNT,
+        "shipping_amount": SHIPPING_PER_ITEM * len(items),
+        "discount_amount": 0,
+    }
+
+
+def build_sales_event(
+    order_id, channel_id, order_item_id, product: ProductModel, quantity, subtotal
+) -> dict:
+    return {
+        "order_id": str(order_id),
+        "order_item_id": str(order_item_id),
+        "product_id": str(product.id),
+        "category_id": str(product.category_id) if product.category_id else None,
+        "channel_id": str(channel_id),
+        "sale_date": datetime.now().isoformat(),
+        "quantity": quantity,
+        "amount": float(subtotal),
+    }
+
+
+async def load_order(db: AsyncSession, order_id) -> OrderModel:
+    """reload an order with its items, server side defaults included"""
+    query = (
+        select(OrderModel)
+        .options(selectinload(OrderModel.items))
+        .where(OrderModel.id == order_id)
+        .execution_options(populate_existing=True)
+    )
+    return (await db.scalars(query)).one()
+
+
 @router.post("/")
 async def place_order(
     background_task: BackgroundTasks,
     req: OrderCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
 ):
     order_number = generate_order_number()
-    print("36")
 
     product_ids = [item.product_id for item in req.items]
     products = {
         p.id: p
-        for p in db.query(ProductModel).filter(ProductModel.id.in_(product_ids)).all()
+        for p in await db.scalars(
+            select(ProductModel).where(ProductModel.id.in_(product_ids))
+        )
     }
 
-    inventories = {
-        inv.product_id: inv
-        for inv in db.query(InventoryModel)
-        .filter(InventoryModel.product_id.in_(product_ids))
-        .all()
-    }
+    error = check_order_products(req.items, products)
+    if error:
+        raise HTTPException(status_code=error[0], detail=error[1])
 
-    for item in req.items:
-        product = products.get(item.product_id)
-        if not product:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Product with id {item.product_id} does not exist",
+    # flash sale products are reserved in redis, the reconciler writes them
+    # back to the inventory later; everything else is decremented in postgres
+    requested = requested_quantities(req.items)
+    try:
+        flash_ids = await flash_inventory.flagged_products(sorted(requested))
+    except RedisError:
+        raise HTTPException(
+            status_code=503, detail="Flash sale stock unavailable, please retry"
+        )
+    flash_quantities = {product_id: requested[product_id] for product_id in flash_ids}
+
+    # one conditional decrement per product, always in product id order so
+    # concurrent orders sharing products take the row locks in the same order
+    decremented = {}
+    for product_id in sorted(set(requested) - set(flash_quantities)):
+        taken = await decrement_inventory(db, product_id, requested[product_id])
+        if taken is None:
+            await db.rollback()
+            available_qty = await db.scalar(
+                select(InventoryModel.quantity).where(
+                    InventoryModel.id == latest_inventory_id(product_id)
+                )
             )
-        if product.status != "ACTIVE":
             raise HTTPException(
                 status_code=400,
-                detail=f"Product with id {item.product_id} is not active",
+                detail=not_enough_inventory(
+                    product_id, requested[product_id], available_qty or 0
+                ),
             )
+        decremented[product_id] = taken
 
-        inventory = inventories.get(item.product_id)
-        available_qty = inventory.quantity if inventory else 0
-        if available_qty < item.quantity:
+    # the row locks are held now; a product flagged since the lookup above has
+    # its stock in redis already, selling it from postgres too would oversell.
+    # The reservation script checks that in the same round trip
+    if flash_quantities or (decremented and settings.FLASH_SALES_ENABLED):
+        try:
+            await flash_inventory.reserve(
+                flash_quantities, user["sub"], unflagged=sorted(decremented)
+            )
+        except flash_inventory.FlashStockShort as e:
+            await db.rollback()
             raise HTTPException(
                 status_code=400,
-                detail=f"Not enough inventory for product id {item.product_id}. Requested: {item.quantity}, Available: {available_qty}",
+                detail=not_enough_inventory(
+                    e.product_id, requested[e.product_id], e.available
+                ),
+            )
+        except flash_inventory.FlashModeChanged:
+            await db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Product stock mode changed, please retry the order",
+            )
+        except RedisError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=503, detail="Flash sale stock unavailable, please retry"
             )
-
-    total_amount = sum(
-        products[item.product_id].price * item.quantity for item in req.items
-    )
-    tax_amount = 1.2
-    shipping_amount = 0.99 * len(req.items)
-    discount_amount = 0
 
     order = OrderModel(
         order_number=order_number,
         channel_id=req.channel_id,
         order_date=req.order_date or datetime.utcnow(),
-        total_amount=total_amount,
-        tax_amount=tax_amount,
-        shipping_amount=shipping_amount,
-        discount_amount=discount_amount,
         status=req.status,
         customer_name=req.customer_name,
         customer_email=req.customer_email,
         shipping_address=req.shipping_address,
         billing_address=req.billing_address,
+        **order_amounts(req.items, products),
     )
 
     try:
         db.add(order)
-        db.flush()
+        await db.flush()
 
+        order_items = []
         for item in req.items:
             product = products[item.product_id]
             order_item = OrderItemModel(
@@ -108,51 +265,248 @@ async def place_order(
                 subtotal=product.price * item.quantity,
             )
             db.add(order_item)
+            order_items.append(order_item)
 
-            inventory = inventories.get(item.product_id)
-            if inventory:
-                previous_quantity = inventory.quantity
-                inventory.quantity -= item.quantity
-                db.add(inventory)
-
-                inventory_history = InventoryHistoryModel(
-                    inventory_id=inventory.id,
-                    previous_quantity=previous_quantity,
-                    new_quantity=inventory.quantity,
+        for product_id, (inventory_id, new_quantity) in decremented.items():
+            db.add(
+                InventoryHistoryModel(
+                    inventory_id=inventory_id,
+                    previous_quantity=new_quantity + requested[product_id],
+                    new_quantity=new_quantity,
                     change_reason="Order placed",
                     changed_by=user["sub"],
                 )
-                db.add(inventory_history)
+            )
+
+        await db.flush()
+
+        sales_events = [
+            build_sales_event(
+                order.id,
+                order.channel_id,
+                order_item.id,
+                products[order_item.product_id],
+                order_item.quantity,
+                order_item.subtotal,
+            )
+            for order_item in order_items
+        ]
 
-        db.commit()
-        db.refresh(order)
+        await db.commit()
+        order = await load_order(db, order.id)
         background_task.add_task(
             send_order_event,
             OrderSchema.model_validate(order, from_attributes=True).model_dump(),
         )
 
-        for item in req.items:
-            product = products[item.product_id]
-            for p in range(item.quantity):
-                sales_event = {
-                    "order_id": str(order.id),
-                    "order_item_id": str(order_item.id),
-                    "product_id": str(item.product_id),
-                    "category_id": (
-                        str(product.category_id) if product.category_id else None
-                    ),
-                    "channel_id": str(order.channel_id),
-                    "sale_date": datetime.now().isoformat(),
-                    "amount": float(product.price),
-                }
-                background_task.add_task(send_sales_event, sales_event)
-                print("will publish: ", p)
+        for sales_event in sales_events:
+            background_task.add_task(send_sales_event, sales_event)
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        if flash_quantities:
+            await flash_inventory.restock(flash_quantities, user["sub"], "Order failed")
         raise HTTPException(status_code=500, detail=f"Failed to place order: {str(e)}")
 
     return {
         "message": "order placed successfully",
         "data": OrderSchema.model_validate(order, from_attributes=True),
     }
+
+
+@router.post("/bulk")
+async def place_orders_bulk(
+    background_task: BackgroundTasks,
+    req: OrderBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    """
+    Validate and place many orders in one transaction. An order that fails
+    validation is reported and skipped, the rest are still placed.
+    """
+    if not req.orders:
+        raise HTTPException(status_code=400, detail="No orders to place")
+    if len(req.orders) > settings.ORDERS_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ORDERS_BULK_MAX_SIZE} orders per request",
+        )
+
+    product_ids = sorted(
+        {item.product_id for order in req.orders for item in order.items}
+    )
+    channel_ids = {order.channel_id for order in req.orders}
+
+    products = {
+        p.id: p
+        for p in await db.scalars(
+            select(ProductModel).where(ProductModel.id.in_(product_ids))
+        )
+    }
+    channels = set(
+        await db.scalars(
+            select(SalesChannelModel.id).where(SalesChannelModel.id.in_(channel_ids))
+        )
+    )
+
+    # latest inventory row per product, rows locked in product order so two
+    # bulk requests touching the same products cannot deadlock
+    inventories: Dict[uuid.UUID, InventoryModel] = {}
+    for inv in await db.scalars(
+        select(InventoryModel)
+        .where(InventoryModel.product_id.in_(product_ids))
+        .order_by(InventoryModel.product_id, InventoryModel.created_at.desc())
+        .with_for_update()
+    ):
+        inventories.setdefault(inv.product_id, inv)
+    # read under the row locks, enabling flash mode takes the same lock
+    flash_ids = set(await flash_inventory.flagged_products(product_ids))
+    available = {
+        product_id: inv.quantity or 0 for product_id, inv in inventories.items()
+    }
+
+    results: List[OrderBulkResult] = []
+    order_rows, item_rows, history_rows, sales_events = [], [], [], []
+    order_numbers = set()
+    for index, order_req in enumerate(req.orders):
+        if order_req.channel_id not in channels:
+            results.append(
+                OrderBulkResult(
+                    index=index,
+                    status="failed",
+                    detail=f"Sales channel with id {order_req.channel_id} "
+                    "does not exist",
+                )
+            )
+            continue
+
+        flash_items = [i for i in order_req.items if i.product_id in flash_ids]
+        if flash_items:
+            results.append(
+                OrderBulkResult(
+                    index=index,
+                    status="failed",
+                    detail=f"Product with id {flash_items[0].product_id} is in "
+                    "flash sale mode, place it through POST /orders/",
+                )
+            )
+            continue
+
+        error = check_order_items(order_req.items, products, available)
+        if error:
+            results.append(
+                OrderBulkResult(index=index, status="failed", detail=error[1])
+            )
+            continue
+
+        order_number = generate_order_number()
+        while order_number in order_numbers:
+            order_number = generate_order_number()
+        order_numbers.add(order_number)
+
+        order_id = uuid.uuid4()
+        order_rows.append(
+            {
+                "id": order_id,
+                "order_number": order_number,
+                "channel_id": order_req.channel_id,
+                "order_date": order_req.order_date or datetime.utcnow(),
+                "status": order_req.status,
+                "customer_name": order_req.customer_name,
+                "customer_email": order_req.customer_email,
+                "shipping_address": order_req.shipping_address,
+                "billing_address": order_req.billing_address,
+                **order_amounts(order_req.items, products),
+            }
+        )
+
+        for item in order_req.items:
+            product = products[item.product_id]
+            order_item_id = uuid.uuid4()
+            subtotal = product.price * item.quantity
+            item_rows.append(
+                {
+                    "id": order_item_id,
+                    "order_id": order_id,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "unit_price": product.price,
+                    "subtotal": subtotal,
+                }
+            )
+            sales_events.append(
+                build_sales_event(
+                    order_id,
+                    order_req.channel_id,
+                    order_item_id,
+                    product,
+                    item.quantity,
+                    subtotal,
+                )
+            )
+
+            inventory = inventories.get(item.product_id)
+            if inventory:
+                previous_quantity = available[item.product_id]
+                available[item.product_id] -= item.quantity
+                history_rows.append(
+                    {
+                        "id": uuid.uuid4(),
+                        "inventory_id": inventory.id,
+                        "previous_quantity": previous_quantity,
+                        "new_quantity": available[item.product_id],
+                        "change_reason": "Order placed",
+                        "changed_by": user["sub"],
+                    }
+                )
+
+        results.append(
+            OrderBulkResult(
+                index=index,
+                status="placed",
+                order_id=order_id,
+                order_number=order_number,
+            )
+        )
+
+    order_events = []
+    try:
+        if order_rows:
+            await db.execute(insert(OrderModel), order_rows)
+            await db.execute(insert(OrderItemModel), item_rows)
+            if history_rows:
+                await db.execute(insert(InventoryHistoryModel), history_rows)
+                await db.execute(
+                    update(InventoryModel),
+                    [
+                        {"id": inv.id, "quantity": available[product_id]}
+                        for product_id, inv in inventories.items()
+                        if available[product_id] != (inv.quantity or 0)
+                    ],
+                )
+        await db.commit()
+
+        if order_rows:
+            placed = await db.scalars(
+                select(OrderModel)
+                .options(selectinload(OrderModel.items))
+                .where(OrderModel.id.in_([row["id"] for row in order_rows]))
+            )
+            order_events = [
+                OrderSchema.model_validate(order, from_attributes=True).model_dump()
+                for order in placed
+            ]
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to place orders: {str(e)}")
+
+    if order_events:
+        background_task.add_task(send_order_batch, order_events, sales_events)
+
+    return {
+        "message": "bulk orders processed",
+        "placed": len(order_rows),
+        "failed": len(req.orders) - len(order_rows),
+        "data": results,
+    }
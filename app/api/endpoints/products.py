@@ -1,12 +1,22 @@
-from typing import Callable, Optional
+from typing import Any, Callable, Dict, Optional
 from fastapi import APIRouter, HTTPException, Depends, Path
+from fastapi import Query as QueryParam
+from fastapi.encoders import jsonable_encoder
+import base64
+import binascii
+import json
+import re
 import uuid
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import Select, case, func, literal, or_, select, tuple_
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from typing import List
 
-from app.api.dependencies import get_current_user, get_db
+from app.api.dependencies import get_current_user, get_async_db
+from app.core import product_cache
 from app.models.product import Product as ProductModel
 from app.models.category import Category as CategoryModel
 
@@ -25,32 +35,68 @@ router = APIRouter(
 )
 
 
-def apply_search(query: Query, search: Optional[str]) -> Query:
-    if search:
+SEARCH_MODES = ("fulltext", "ilike")
+
+
+def prefix_tsquery(search: str):
+    """match every word of the search as a prefix, e.g. `blue sho` -> blue:* & sho:*"""
+    terms = re.findall(r"\w+", search)
+    if not terms:
+        return None
+    return func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+
+
+def sku_prefix_match(search: str):
+    escaped = re.sub(r"([\\%_])", r"\\\1", search.strip().upper())
+    return func.upper(ProductModel.sku).like(f"{escaped}%", escape="\\")
+
+
+def apply_search(query: Select, search: Optional[str], mode: str = "fulltext") -> Select:
+    if not search:
+        return query
+    if mode == "ilike":
         search_pattern = f"%{search}%"
         return query.filter(
             (ProductModel.sku.ilike(search_pattern))
             | (ProductModel.name.ilike(search_pattern))
             | (ProductModel.description.ilike(search_pattern))
         )
-    return query
+
+    conditions = [sku_prefix_match(search), ProductModel.name.op("%")(search)]
+    tsquery = prefix_tsquery(search)
+    if tsquery is not None:
+        conditions.append(ProductModel.search_vector.op("@@")(tsquery))
+    return query.filter(or_(*conditions))
+
+
+def apply_rank(query: Select, search: Optional[str], ranked: bool) -> Select:
+    """order full-text matches by relevance, exact sku prefixes first"""
+    if not (search and ranked):
+        return query
+    rank = func.similarity(ProductModel.name, search) + case(
+        (sku_prefix_match(search), 1.0), else_=0.0
+    )
+    tsquery = prefix_tsquery(search)
+    if tsquery is not None:
+        rank = rank + func.ts_rank_cd(ProductModel.search_vector, tsquery)
+    return query.order_by(rank.desc())
 
 
-def apply_filter_category(query: Query, category_id: Optional[str]) -> Query:
+def apply_filter_category(query: Select, category_id: Optional[str]) -> Select:
     if category_id:
         return query.filter(ProductModel.category_id == category_id)
     return query
 
 
-def apply_filter_created_by(query: Query, created_by: Optional[str]) -> Query:
+def apply_filter_created_by(query: Select, created_by: Optional[str]) -> Select:
     if created_by:
         return query.filter(ProductModel.created_by == created_by)
     return query
 
 
 def apply_sort(
-    query: Query, field: Optional[str], direction: Optional[str], field_map: dict
-) -> Query:
+    query: Select, field: Optional[str], direction: Optional[str], field_map: dict
+) -> Select:
     if field and direction and field in field_map:
         col = field_map[field]
         if direction.lower() == "asc":
@@ -60,29 +106,126 @@ def apply_sort(
     return query
 
 
-@router.get("/{product_sku}")
-async def get_product_detail(product_sku: str, db: Session = Depends(get_db)):
-    product = (
-        db.query(ProductModel)
-        .options(
-            joinedload(ProductModel.creator),
-            joinedload(ProductModel.category),
+SORT_FIELDS = {
+    "price": ProductModel.price,
+    "cost_price": ProductModel.cost_price,
+    "name": ProductModel.name,
+    "created_at": ProductModel.created_at,
+}
+
+CURSOR_VALUE_PARSERS: Dict[str, Callable[[str], Any]] = {
+    "price": Decimal,
+    "cost_price": Decimal,
+    "name": str,
+    "created_at": datetime.fromisoformat,
+}
+
+
+def encode_cursor(
+    product: ProductModel, sort_field: Optional[str], direction: str
+) -> str:
+    payload = {
+        "field": sort_field,
+        "direction": direction,
+        "value": getattr(product, sort_field) if sort_field else None,
+        "id": product.id,
+    }
+    raw = json.dumps(payload, default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        payload["id"] = uuid.UUID(payload["id"])
+        if payload["field"]:
+            parse = CURSOR_VALUE_PARSERS[payload["field"]]
+            payload["value"] = parse(payload["value"])
+        return payload
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def apply_cursor(
+    query: Select, cursor: Optional[str], sort_field: Optional[str], direction: str
+) -> Select:
+    """keep rows strictly after the cursor in (sort column, id) order"""
+    if not cursor:
+        return query
+    payload = decode_cursor(cursor)
+    if payload["field"] != sort_field or payload["direction"] != direction:
+        raise HTTPException(
+            status_code=400, detail="Pagination cursor does not match the sort order"
+        )
+    if sort_field:
+        column = SORT_FIELDS[sort_field]
+        key = tuple_(column, ProductModel.id)
+        bound = tuple_(
+            literal(payload["value"], column.type),
+            literal(payload["id"], ProductModel.id.type),
         )
-        .filter(ProductModel.sku == product_sku)
-        .first()
+    else:
+        key, bound = ProductModel.id, payload["id"]
+    return query.filter(key > bound if direction == "asc" else key < bound)
+
+
+async def exact_count(db: AsyncSession, query: Select) -> int:
+    subquery = query.order_by(None).subquery()
+    return await db.scalar(select(func.count()).select_from(subquery))
+
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+    """row estimate from the planner statistics, without scanning the table"""
+    connection = await db.connection()
+    compiled = query.order_by(None).compile(dialect=connection.dialect)
+    if compiled.positiontup is not None:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", params
     )
-    if not product:
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+@router.get("/{product_sku}")
+async def get_product_detail(
+    product_sku: str, db: AsyncSession = Depends(get_async_db)
+):
+    detail = await product_cache.get_cached_product(product_sku)
+    if detail is None:
+        started_at = await product_cache.start_lookup(product_sku)
+        product = await db.scalar(
+            select(ProductModel)
+            .options(
+                joinedload(ProductModel.creator),
+                joinedload(ProductModel.category),
+            )
+            .where(ProductModel.sku == product_sku)
+        )
+        if product:
+            detail = jsonable_encoder(
+                ProductSchema.model_validate(product, from_attributes=True)
+            )
+        else:
+            detail = product_cache.MISSING
+        await product_cache.cache_product(product_sku, detail, started_at)
+
+    if detail == product_cache.MISSING:
         raise HTTPException(status_code=404, detail="Product not found")
 
     return {
         "message": "Product retrieve successful",
-        "data": ProductSchema.model_validate(product, from_attributes=True),
+        "data": detail,
     }
 
 
 @router.get("/")
 async def get_product_lists(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     search: Optional[str] = None,
     category_id: Optional[str] = None,
     created_by: Optional[str] = None,
@@ -92,11 +235,44 @@ async def get_product_lists(
     sort_created_at: Optional[str] = None,
     limit: int = 20,
     skip: int = 0,
+    cursor: Optional[str] = None,
+    count: str = QueryParam("exact", description="exact|estimated|none"),
+    search_mode: str = QueryParam("ilike", description="ilike|fulltext"),
 ):
-    query = db.query(ProductModel)
+    if count not in ("exact", "estimated", "none"):
+        raise HTTPException(status_code=400, detail="Invalid count value")
+    if search_mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail="Invalid search_mode value")
+
+    sorts = {
+        field: direction.lower()
+        for field, direction in (
+            ("price", sort_price),
+            ("cost_price", sort_cost_price),
+            ("name", sort_name),
+            ("created_at", sort_created_at),
+        )
+        if direction and direction.lower() in ("asc", "desc")
+    }
+    if cursor and len(sorts) > 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor pagination supports a single sort parameter",
+        )
+    sort_field = next(iter(sorts), None)
+    direction = sorts.get(sort_field, "asc")
+
+    ranked = bool(search) and search_mode == "fulltext" and not sorts
+    if cursor and ranked:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor pagination of ranked search results needs a sort parameter",
+        )
+
+    query = select(ProductModel)
 
-    pipeline: List[Callable[[Query], Query]] = [
-        lambda q: apply_search(q, search),
+    pipeline: List[Callable[[Select], Select]] = [
+        lambda q: apply_search(q, search, search_mode),
         lambda q: apply_filter_category(q, category_id),
         lambda q: apply_filter_created_by(q, created_by),
         lambda q: apply_sort(q, "price", sort_price, {"price": ProductModel.price}),
@@ -107,13 +283,33 @@ async def get_product_lists(
         lambda q: apply_sort(
             q, "created_at", sort_created_at, {"created_at": ProductModel.created_at}
         ),
+        lambda q: apply_rank(q, search, ranked),
     ]
 
     for step in pipeline:
         query = step(query)
 
-    total = query.count()
-    products = query.offset(skip).limit(limit).all()
+    if count == "exact":
+        total = await exact_count(db, query)
+    elif count == "estimated":
+        total = await estimate_count(db, query)
+    else:
+        total = None
+
+    if direction == "asc":
+        query = query.order_by(ProductModel.id.asc())
+    else:
+        query = query.order_by(ProductModel.id.desc())
+    if cursor:
+        query = apply_cursor(query, cursor, sort_field, direction).limit(limit)
+    else:
+        query = query.offset(skip).limit(limit)
+    products = (await db.scalars(query)).all()
+
+    next_cursor = None
+    if products and len(products) == limit and len(sorts) <= 1 and not ranked:
+        next_cursor = encode_cursor(products[-1], sort_field, direction)
+
     product_list = [
         ProductSecondarySchema.model_validate(product, from_attributes=True)
         for product in products
@@ -124,18 +320,21 @@ async def get_product_lists(
         "total": total,
         "limit": limit,
         "skip": skip,
+        "next_cursor": next_cursor,
     }
 
 
 @router.post("/")
 async def create_product(
-    req: ProductCreate, db: Session = Depends(get_db), user=Depends(get_current_user)
+    req: ProductCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
 ):
     if req.category_identifier:
-        cat = (
-            db.query(CategoryModel)
-            .filter(CategoryModel.identifier == req.category_identifier)
-            .first()
+        cat = await db.scalar(
+            select(CategoryModel).where(
+                CategoryModel.identifier == req.category_identifier
+            )
         )
 
     product = ProductModel(
@@ -152,14 +351,15 @@ async def create_product(
 
     try:
         db.add(product)
-        db.commit()
-        db.refresh(product)
+        await db.commit()
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         if 'unique constraint "product_sku_key"' in str(e.orig):
             raise HTTPException(status_code=400, detail="Sku already exists")
         raise HTTPException(status_code=400, detail="Database integerity error")
 
+    # the sku may be negatively cached from an earlier lookup
+    await product_cache.invalidate_products(product.sku)
     return {"message": "product added succesfully"}
 
 
@@ -167,22 +367,30 @@ async def create_product(
 async def update(
     req: ProductUpdateSchema,
     product_id: uuid.UUID = Path(..., description="The UUID of the product"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    product = await db.scalar(
+        select(ProductModel)
+        .options(
+            joinedload(ProductModel.creator),
+            joinedload(ProductModel.category),
+        )
+        .where(ProductModel.id == product_id)
+    )
 
     if not product:
         raise HTTPException(status_code=404, detail="Unable to find the product")
 
     updated_data = req.model_dump(exclude_unset=True)
+    previous_sku = product.sku
 
     if "category_identifier" in updated_data:
         category_identifier = updated_data.pop("category_identifier")
         if category_identifier:
-            category = (
-                db.query(CategoryModel)
-                .filter(CategoryModel.identifier == category_identifier)
-                .first()
+            category = await db.scalar(
+                select(CategoryModel).where(
+                    CategoryModel.identifier == category_identifier
+                )
             )
             if not category:
                 raise HTTPException(
@@ -195,12 +403,13 @@ async def update(
         setattr(product, field, value)
 
     try:
-        db.commit()
-        db.refresh(product)
+        await db.commit()
+        await db.refresh(product, ["updated_at", "category"])
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Unable to update the product")
 
+    await product_cache.invalidate_products(previous_sku, product.sku)
     return {
         "message": "product updated successfully",
         "data": ProductSchema.model_validate(product, from_attributes=True),
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_
-from datetime import date
+from sqlalchemy import Date, cast, func, extract, and_, literal_column, select
+from datetime import date, timedelta
 from typing import Optional
 
 from app.api.dependencies import get_db
-from app.models.sales import Sales as SalesModel
+from app.core.analytics_cache import cache_stats, cached_result
+from app.models.category import Category as CategoryModel
+from app.models.category_closure import CategoryClosure as CategoryClosureModel
+from app.models.sales_rollup import ROLLUP_GRAINS, SalesRollup as SalesRollupModel
 
 router = APIRouter(
     prefix="/sales",
@@ -14,6 +17,55 @@ router = APIRouter(
 )
 
 
+def is_period_start(grain: str, day: date) -> bool:
+    if grain == "week":
+        return day.weekday() == 0
+    if grain == "month":
+        return day.day == 1
+    if grain == "year":
+        return day.month == 1 and day.day == 1
+    return True
+
+
+def pick_rollup_grain(
+    start_date: Optional[date], end_date: Optional[date], grains=ROLLUP_GRAINS
+) -> str:
+    """
+    Coarsest grain among `grains` whose periods line up with the requested
+    range, so summing whole rollup periods gives the exact answer.
+    """
+    for grain in sorted(grains, key=ROLLUP_GRAINS.index, reverse=True):
+        if start_date and not is_period_start(grain, start_date):
+            continue
+        if end_date and not is_period_start(grain, end_date + timedelta(days=1)):
+            continue
+        return grain
+    return "day"
+
+
+def apply_rollup_filters(
+    query,
+    grain: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    product_id: Optional[str] = None,
+    category_id: Optional[str] = None,
+    channel_id: Optional[str] = None,
+):
+    filters = [SalesRollupModel.grain == grain]
+    if start_date:
+        filters.append(SalesRollupModel.period_start >= start_date)
+    if end_date:
+        filters.append(SalesRollupModel.period_start <= end_date)
+    if product_id:
+        filters.append(SalesRollupModel.product_id == product_id)
+    if category_id:
+        filters.append(SalesRollupModel.category_id == category_id)
+    if channel_id:
+        filters.append(SalesRollupModel.channel_id == channel_id)
+    return query.filter(and_(*filters))
+
+
 @router.get("/revenue")
 def get_revenue(
     db: Session = Depends(get_db),
@@ -24,65 +76,69 @@ def get_revenue(
     channel_id: Optional[str] = Query(None),
     group_by: Optional[str] = Query("day", description="day|week|month|year"),
 ):
-    query = db.query(
-        func.sum(SalesModel.amount).label("total_revenue"),
-        func.count(SalesModel.id).label("total_sales"),
-    )
+    if group_by not in ROLLUP_GRAINS:
+        raise HTTPException(status_code=400, detail="Invalid group_by value")
+
+    params = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "product_id": product_id,
+        "category_id": category_id,
+        "channel_id": channel_id,
+        "group_by": group_by,
+    }
+    return cached_result("revenue", params, lambda: revenue_query(db, **params))
+
+
+def revenue_query(
+    db: Session,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    product_id: Optional[str],
+    category_id: Optional[str],
+    channel_id: Optional[str],
+    group_by: str,
+):
+    grain = pick_rollup_grain(start_date, end_date, grains=("day", group_by))
+    if grain == group_by:
+        bucket = SalesRollupModel.period_start
+    else:
+        bucket = func.date_trunc(
+            literal_column(f"'{group_by}'"), SalesRollupModel.period_start
+        )
 
     if group_by == "day":
-        query = query.add_columns(func.date(SalesModel.sale_date).label("period"))
-        query = query.group_by(func.date(SalesModel.sale_date))
+        columns = [cast(bucket, Date).label("period")]
     elif group_by == "week":
-        query = query.add_columns(
-            extract("year", SalesModel.sale_date).label("year"),
-            extract("week", SalesModel.sale_date).label("week"),
-        )
-        query = query.group_by(
-            extract("year", SalesModel.sale_date), extract("week", SalesModel.sale_date)
-        )
+        columns = [
+            extract("isoyear", bucket).label("year"),
+            extract("week", bucket).label("week"),
+        ]
     elif group_by == "month":
-        query = query.add_columns(
-            extract("year", SalesModel.sale_date).label("year"),
-            extract("month", SalesModel.sale_date).label("month"),
-        )
-        query = query.group_by(
-            extract("year", SalesModel.sale_date),
-            extract("month", SalesModel.sale_date),
-        )
-    elif group_by == "year":
-        query = query.add_columns(extract("year", SalesModel.sale_date).label("year"))
-        query = query.group_by(extract("year", SalesModel.sale_date))
+        columns = [
+            extract("year", bucket).label("year"),
+            extract("month", bucket).label("month"),
+        ]
     else:
-        raise HTTPException(status_code=400, detail="Invalid group_by value")
-
-    filters = []
-    if start_date:
-        filters.append(SalesModel.sale_date >= start_date)
-    if end_date:
-        filters.append(SalesModel.sale_date <= end_date)
-    if product_id:
-        filters.append(SalesModel.product_id == product_id)
-    if category_id:
-        filters.append(SalesModel.category_id == category_id)
-    if channel_id:
-        filters.append(SalesModel.channel_id == channel_id)
+        columns = [extract("year", bucket).label("year")]
 
-    if filters:
-        query = query.filter(and_(*filters))
+    query = db.query(
+        func.sum(SalesRollupModel.total_revenue).label("total_revenue"),
+        func.sum(SalesRollupModel.total_sales).label("total_sales"),
+        *columns,
+    )
+    query = apply_rollup_filters(
+        query,
+        grain,
+        start_date=start_date,
+        end_date=end_date,
+        product_id=product_id,
+        category_id=category_id,
+        channel_id=channel_id,
+    )
+    query = query.group_by(bucket).order_by(bucket)
 
-    results = query.all()
-    data = []
-    for row in results:
-        if hasattr(row, "_asdict"):
-            data.append(row._asdict())
-        elif isinstance(row, tuple):
-            keys = row.keys() if hasattr(row, "keys") else []
-            if keys:
-                data.append({k: v for k, v in zip(keys, row)})
-            else:
-                data.append({"value_" + str(i): v for i, v in enumerate(row)})
-        else:
-            data.append({"value": row})
+    data = [row._asdict() for row in query.all()]
     return {"message": "Revenue data", "data": data}
 
 
@@ -96,10 +152,14 @@ def compare_revenue(
     category_id: Optional[str] = Query(None),
 ):
     def get_revenue_for_period(start, end):
-        q = db.query(func.sum(SalesModel.amount).label("revenue"))
-        q = q.filter(SalesModel.sale_date >= start, SalesModel.sale_date <= end)
-        if category_id:
-            q = q.filter(SalesModel.category_id == category_id)
+        q = db.query(func.sum(SalesRollupModel.total_revenue).label("revenue"))
+        q = apply_rollup_filters(
+            q,
+            pick_rollup_grain(start, end),
+            start_date=start,
+            end_date=end,
+            category_id=category_id,
+        )
         return q.scalar() or 0
 
     revenue1 = get_revenue_for_period(period1_start, period1_end)
@@ -118,19 +178,36 @@ def sales_by_product(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     category_id: Optional[str] = Query(None),
+):
+    params = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "category_id": category_id,
+    }
+    return cached_result(
+        "by-product", params, lambda: sales_by_product_query(db, **params)
+    )
+
+
+def sales_by_product_query(
+    db: Session,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    category_id: Optional[str],
 ):
     query = db.query(
-        SalesModel.product_id,
-        func.sum(SalesModel.amount).label("total_revenue"),
-        func.count(SalesModel.id).label("total_sales"),
+        SalesRollupModel.product_id,
+        func.sum(SalesRollupModel.total_revenue).label("total_revenue"),
+        func.sum(SalesRollupModel.total_sales).label("total_sales"),
     )
-    if start_date:
-        query = query.filter(SalesModel.sale_date >= start_date)
-    if end_date:
-        query = query.filter(SalesModel.sale_date <= end_date)
-    if category_id:
-        query = query.filter(SalesModel.category_id == category_id)
-    query = query.group_by(SalesModel.product_id)
+    query = apply_rollup_filters(
+        query,
+        pick_rollup_grain(start_date, end_date),
+        start_date=start_date,
+        end_date=end_date,
+        category_id=category_id,
+    )
+    query = query.group_by(SalesRollupModel.product_id)
 
     results = query.all()
     data = [
@@ -149,17 +226,28 @@ def sales_by_category(
     db: Session = Depends(get_db),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
+):
+    params = {"start_date": start_date, "end_date": end_date}
+    return cached_result(
+        "by-category", params, lambda: sales_by_category_query(db, **params)
+    )
+
+
+def sales_by_category_query(
+    db: Session, start_date: Optional[date], end_date: Optional[date]
 ):
     query = db.query(
-        SalesModel.category_id,
-        func.sum(SalesModel.amount).label("total_revenue"),
-        func.count(SalesModel.id).label("total_sales"),
+        SalesRollupModel.category_id,
+        func.sum(SalesRollupModel.total_revenue).label("total_revenue"),
+        func.sum(SalesRollupModel.total_sales).label("total_sales"),
     )
-    if start_date:
-        query = query.filter(SalesModel.sale_date >= start_date)
-    if end_date:
-        query = query.filter(SalesModel.sale_date <= end_date)
-    query = query.group_by(SalesModel.category_id)
+    query = apply_rollup_filters(
+        query,
+        pick_rollup_grain(start_date, end_date),
+        start_date=start_date,
+        end_date=end_date,
+    )
+    query = query.group_by(SalesRollupModel.category_id)
 
     results = query.all()
     data = [
@@ -171,3 +259,72 @@ def sales_by_category(
         for row in results
     ]
     return {"message": "Sales by category", "data": data}
+
+
+@router.get("/by-category-tree")
+def sales_by_category_tree(
+    db: Session = Depends(get_db),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    category_id: Optional[str] = Query(
+        None, description="only this category and its descendants"
+    ),
+):
+    params = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "category_id": category_id,
+    }
+    return cached_result(
+        "by-category-tree",
+        params,
+        lambda: sales_by_category_tree_query(db, **params),
+    )
+
+
+def sales_by_category_tree_query(
+    db: Session,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    category_id: Optional[str],
+):
+    """
+    Revenue of every category including all of its descendants. Each rollup
+    row joins the closure rows of its leaf category, so it is counted once
+    for the leaf and once for every ancestor, in a single aggregate.
+    """
+    query = (
+        db.query(
+            CategoryModel.id.label("category_id"),
+            CategoryModel.parent_id,
+            CategoryModel.identifier,
+            CategoryModel.name,
+            func.sum(SalesRollupModel.total_revenue).label("total_revenue"),
+            func.sum(SalesRollupModel.total_sales).label("total_sales"),
+        )
+        .join(
+            CategoryClosureModel,
+            CategoryClosureModel.descendant_id == SalesRollupModel.category_id,
+        )
+        .join(CategoryModel, CategoryModel.id == CategoryClosureModel.ancestor_id)
+    )
+    query = apply_rollup_filters(
+        query,
+        pick_rollup_grain(start_date, end_date),
+        start_date=start_date,
+        end_date=end_date,
+    )
+    if category_id:
+        subtree = select(CategoryClosureModel.descendant_id).where(
+            CategoryClosureModel.ancestor_id == category_id
+        )
+        query = query.filter(CategoryClosureModel.ancestor_id.in_(subtree))
+    query = query.group_by(CategoryModel.id)
+
+    data = [row._asdict() for row in query.all()]
+    return {"message": "Sales by category tree", "data": data}
+
+
+@router.get("/cache-stats")
+def sales_cache_stats():
+    return {"message": "Sales analytics cache stats", "data": cache_stats()}
@@ -1,13 +1,17 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schema.sales_channel import (
     SalesChannelCreate,
     SalesChannel as SalesChannelSchema,
 )
-from app.api.dependencies import get_db
+from app.api.dependencies import get_async_db
 from app.models.sales_channel import SalesChannel as SalesChannelModel
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/sales-channels",
     tags=["sales-channels"],
@@ -16,8 +20,8 @@ router = APIRouter(
 
 
 @router.get("/")
-async def get_sales_channel(db: Session = Depends(get_db)):
-    channels = db.query(SalesChannelModel).all()
+async def get_sales_channel(db: AsyncSession = Depends(get_async_db)):
+    channels = (await db.scalars(select(SalesChannelModel))).all()
 
     data = [
         SalesChannelSchema.model_validate(channel, from_attributes=True)
@@ -28,7 +32,9 @@ async def get_sales_channel(db: Session = Depends(get_db)):
 
 
 @router.post("/")
-async def add_sales_channel(req: SalesChannelCreate, db: Session = Depends(get_db)):
+async def add_sales_channel(
+    req: SalesChannelCreate, db: AsyncSession = Depends(get_async_db)
+):
     channel = SalesChannelModel(
         name=req.name,
         status=req.status,
@@ -36,11 +42,11 @@ async def add_sales_channel(req: SalesChannelCreate, db: Session = Depends(get_d
 
     try:
         db.add(channel)
-        db.commit()
-        db.refresh(channel)
-    except Exception as e:
-        print(e)
-        db.rollback()
+        await db.commit()
+        await db.refresh(channel)
+    except Exception:
+        logger.exception("Unable to add sales channel")
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail="unable to add sales channel at the moment"
         )
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.jwt import create_access_token
 from app.schema import UserCreate
 from app.models.users import User as UserModel
-from app.api.dependencies import get_db, get_redis
-from app.core.security import get_password_hash, rate_limiting, verify_password
+from app.api.dependencies import get_async_db, get_redis
+from app.core.security import check_password, hash_password, rate_limiting
+from app.core.session_cache import rotate_user_session
 from redis import Redis
 
 from app.schema.auth import LoginRequest
@@ -20,7 +22,7 @@ router = APIRouter(
 @router.post("/register")
 async def register(
     req: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     redis_client: Redis = Depends(get_redis),
     request: Request = None,
 ):
@@ -28,16 +30,16 @@ async def register(
     ip = request.client.host if request else "unknown"
     rate_limiting(ip, "registeration", redis_client)
 
-    existing_user = (
-        db.query(UserModel)
-        .filter((UserModel.email == req.email) | (UserModel.username == req.username))
-        .first()
+    existing_user = await db.scalar(
+        select(UserModel)
+        .where((UserModel.email == req.email) | (UserModel.username == req.username))
+        .limit(1)
     )
 
     if existing_user:
         raise HTTPException(status_code=400, detail="invalid email or password")
 
-    hashed_password = get_password_hash(req.password)
+    hashed_password = await hash_password(req.password)
 
     user = UserModel(
         email=req.email,
@@ -48,8 +50,8 @@ async def register(
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     access_token = create_access_token(
         data={
@@ -60,29 +62,32 @@ async def register(
     )
 
     redis_client.set(f"session:{user.id}", str(access_token), 60 * 60)
+    rotate_user_session(redis_client, str(user.id))
     return {"message": "Successfully registered", "access_token": access_token}
 
 
 @router.post("/login")
 async def login(
     req: LoginRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     redis_client: Redis = Depends(get_redis),
     request: Request = None,
 ):
     ip = request.client.host if request else "unknown"
     rate_limiting(ip, "registeration", redis_client)
 
+    user = None
     if req.email:
-        user = db.query(UserModel).filter(UserModel.email == req.email).first()
-
-    if req.username:
-        user = db.query(UserModel).filter(UserModel.password == req.password).first()
+        user = await db.scalar(select(UserModel).where(UserModel.email == req.email))
+    elif req.username:
+        user = await db.scalar(
+            select(UserModel).where(UserModel.username == req.username)
+        )
 
     if not user:
         raise HTTPException(status_code=400, detail="invalid email or password")
 
-    is_matched = verify_password(req.password, user.password)
+    is_matched = await check_password(req.password, user.password)
 
     if not is_matched:
         raise HTTPException(status_code=400, detail="invalid email or password")
@@ -96,4 +101,5 @@ async def login(
     )
 
     redis_client.set(f"session:{user.id}", str(access_token), 60 * 60)
+    rotate_user_session(redis_client, str(user.id))
     return {"message": "success", "access_token": access_token}
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_KEY = "sales:data_version"
+
+CACHE_HITS = Counter(
+    "sales_cache_hits_total", "Sales analytics answers served from redis", ("endpoint",)
+)
+CACHE_MISSES = Counter(
+    "sales_cache_misses_total",
+    "Sales analytics answers computed from the database",
+    ("endpoint",),
+)
+
+
+def bump_data_version() -> None:
+    """invalidate every cached analytics answer, called after new sales commit"""
+    try:
+        get_redis().incr(DATA_VERSION_KEY)
+    except RedisError as e:
+        logger.warning("Unable to bump sales data version: %s", e)
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    normalized = {
+        key: str(value).strip().lower()
+        for key, value in params.items()
+        if value is not None and value != ""
+    }
+    return json.dumps(normalized, sort_keys=True)
+
+
+def cached_result(endpoint: str, params: Dict[str, Any], compute: Callable[[], Any]):
+    """
+    Return the answer for `endpoint` and `params` from redis, computing and
+    storing it on a miss. Keys embed the current data version, so answers
+    cached before the last ingested batch are never read again.
+    """
+    redis = get_redis()
+    digest = hashlib.sha1(normalize_params(params).encode("utf-8")).hexdigest()
+    try:
+        version = int(redis.get(DATA_VERSION_KEY) or 0)
+        key = f"sales:cache:{endpoint}:{version}:{digest}"
+        cached = redis.get(key)
+    except RedisError:
+        CACHE_MISSES.labels(endpoint=endpoint).inc()
+        return jsonable_encoder(compute())
+
+    if cached is not None:
+        CACHE_HITS.labels(endpoint=endpoint).inc()
+        return json.loads(cached)
+
+    CACHE_MISSES.labels(endpoint=endpoint).inc()
+    result = jsonable_encoder(compute())
+    try:
+        redis.set(key, json.dumps(result), ex=settings.SALES_CACHE_TTL_SECONDS)
+    except RedisError as e:
+        logger.warning("Unable to cache %s result: %s", endpoint, e)
+    return result
+
+
+def cache_stats() -> Dict[str, Any]:
+    stats = {}
+    for endpoint_labels, hits in CACHE_HITS.children():
+        stats.setdefault(endpoint_labels[0], {"hits": 0, "misses": 0})
+        stats[endpoint_labels[0]]["hits"] = int(hits.value)
+    for endpoint_labels, misses in CACHE_MISSES.children():
+        stats.setdefault(endpoint_labels[0], {"hits": 0, "misses": 0})
+        stats[endpoint_labels[0]]["misses"] = int(misses.value)
+    return stats
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+from app.db.redis import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBERS = Gauge(
+    "broadcast_subscribers", "Local subscribers per redis channel", ("channel",)
+)
+DROPPED_MESSAGES = Counter(
+    "broadcast_dropped_messages_total",
+    "Messages dropped because a subscriber queue was full",
+    ("channel",),
+)
+
+
+class Subscription:
+    """bounded per-client queue, a slow client loses its oldest messages"""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message: str) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            DROPPED_MESSAGES.labels(channel=self.channel).inc()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[str]:
+        """next message, or None when nothing arrived within `timeout`"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broadcaster:
+    """
+    Holds a single redis pubsub connection per process and fans every message
+    out to the local subscribers of its channel.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        # orders redis subscribe and unsubscribe calls of the pubsub connection
+        self._channels_lock = asyncio.Lock()
+        self._releases: Set[asyncio.Task] = set()
+
+    async def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel, self.queue_size)
+        is_new_channel = channel not in self._subscribers
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        SUBSCRIBERS.labels(channel=channel).inc()
+
+        if self._pubsub is None:
+            self._pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+        if is_new_channel:
+            try:
+                async with self._channels_lock:
+                    await self._pubsub.subscribe(channel)
+            except BaseException:
+                # forget the channel, the next subscribe has to try again
+                self._subscribers[channel].discard(subscription)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+                SUBSCRIBERS.labels(channel=channel).dec()
+                raise
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+        return subscription
+
+    async def subscribe_with_retry(
+        self, channel: str, max_delay: float = 60.0
+    ) -> Subscription:
+        """subscribe, retrying with backoff while redis is unavailable"""
+        delay = 1.0
+        while True:
+            try:
+                return await self.subscribe(channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Unable to subscribe to %s, retrying in %.0fs: %s",
+                    channel,
+                    delay,
+                    e,
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        channel = subscription.channel
+        subscribers = self._subscribers.get(channel, set())
+        if subscription in subscribers:
+            subscribers.discard(subscription)
+            SUBSCRIBERS.labels(channel=channel).dec()
+        if channel in self._subscribers and not subscribers:
+            # nobody here reads the channel anymore, stop receiving it
+            del self._subscribers[channel]
+            task = asyncio.get_running_loop().create_task(self._release(channel))
+            self._releases.add(task)
+            task.add_done_callback(self._releases.discard)
+
+    async def _release(self, channel: str) -> None:
+        async with self._channels_lock:
+            # a subscriber may have come back while waiting for the lock
+            if channel in self._subscribers or self._pubsub is None:
+                return
+            try:
+                await self._pubsub.unsubscribe(channel)
+            except Exception as e:
+                logger.warning("Unable to unsubscribe from %s: %s", channel, e)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.reset()
+            self._pubsub = None
+        self._subscribers.clear()
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Redis broadcast subscription failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            if not message or message["type"] != "message":
+                continue
+
+            channel = message["channel"].decode("utf-8")
+            data = message["data"].decode("utf-8")
+            for subscription in list(self._subscribers.get(channel, ())):
+                subscription.deliver(data)
+
+
+broadcaster = Broadcaster(queue_size=settings.SSE_CLIENT_QUEUE_SIZE)
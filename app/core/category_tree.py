@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.analytics_cache import bump_data_version
+from app.core.broadcast import broadcaster
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.product_cache import invalidate_all_products
+from app.db.redis import get_redis
+from app.models.category import Category as CategoryModel
+from app.schema.category import Category as CategorySchema
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_TREE_LOADS = Counter(
+    "category_tree_loads_total", "Times the category tree was loaded from postgres"
+)
+
+
+class CategoryTree:
+    """Immutable snapshot of the category table, indexed by id and identifier"""
+
+    def __init__(self, categories: List[dict]):
+        self.by_id: Dict[uuid.UUID, dict] = {c["id"]: c for c in categories}
+        self.by_identifier: Dict[str, dict] = {c["identifier"]: c for c in categories}
+        self.children: Dict[Optional[uuid.UUID], List[uuid.UUID]] = {}
+        for category in sorted(categories, key=lambda c: c["name"]):
+            parent_id = category["parent_id"]
+            if parent_id not in self.by_id:
+                parent_id = None
+            self.children.setdefault(parent_id, []).append(category["id"])
+
+    def all(self) -> List[dict]:
+        return [dict(category) for category in self.by_id.values()]
+
+    def ancestors(self, category_id: uuid.UUID) -> List[dict]:
+        """root first, excluding the category itself"""
+        path = []
+        seen = {category_id}
+        parent_id = self.by_id[category_id]["parent_id"]
+        while parent_id in self.by_id and parent_id not in seen:
+            seen.add(parent_id)
+            path.append(dict(self.by_id[parent_id]))
+            parent_id = self.by_id[parent_id]["parent_id"]
+        path.reverse()
+        return path
+
+    def descendant_ids(self, category_id: uuid.UUID) -> List[uuid.UUID]:
+        """the category and everything below it, depth first"""
+        ids, stack = [], [category_id]
+        seen = set()
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            ids.append(current)
+            stack.extend(reversed(self.children.get(current, [])))
+        return ids
+
+    def subtree(self, category_id: uuid.UUID, _seen=None) -> dict:
+        seen = _seen if _seen is not None else set()
+        seen.add(category_id)
+        node = dict(self.by_id[category_id])
+        node["children"] = [
+            self.subtree(child_id, seen)
+            for child_id in self.children.get(category_id, [])
+            if child_id not in seen
+        ]
+        return node
+
+    def with_parents(self, category_id: uuid.UUID) -> dict:
+        """category with its parent chain nested under `parent`"""
+        detail = None
+        for ancestor in self.ancestors(category_id):
+            ancestor["parent"] = detail
+            detail = ancestor
+        category = dict(self.by_id[category_id])
+        category["parent"] = detail
+        return category
+
+
+_tree: Optional[CategoryTree] = None
+_loaded_at = 0.0
+_version = 0
+
+
+def invalidate_category_tree() -> None:
+    global _tree, _version
+    _version += 1
+    _tree = None
+
+
+async def get_category_tree(db: AsyncSession) -> CategoryTree:
+    """the cached tree, loaded with a single query when missing or stale"""
+    global _tree, _loaded_at
+    tree = _tree
+    if tree is not None and time.monotonic() - _loaded_at < (
+        settings.CATEGORY_TREE_TTL_SECONDS
+    ):
+        return tree
+
+    version = _version
+    categories = await db.scalars(select(CategoryModel))
+    tree = CategoryTree(
+        [
+            CategorySchema.model_validate(c, from_attributes=True).model_dump()
+            for c in categories
+        ]
+    )
+    CATEGORY_TREE_LOADS.inc()
+    # a write committed while loading makes this snapshot stale already
+    if version == _version:
+        _tree, _loaded_at = tree, time.monotonic()
+    return tree
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_category_writes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, CategoryModel):
+            session.info["category_tree_dirty"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_category_writes(session):
+    if not session.info.pop("category_tree_dirty", False):
+        return
+    invalidate_category_tree()
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # a sync session in a worker thread, blocking on redis is fine here
+        publish_category_change()
+        return
+    # inside `await db.commit()`, the handler dispatches it off the event loop
+    session.info["category_tree_committed"] = True
+
+
+async def dispatch_category_writes(db: AsyncSession) -> None:
+    """call after committing category writes through an AsyncSession"""
+    if db.sync_session.info.pop("category_tree_committed", False):
+        await asyncio.to_thread(publish_category_change)
+
+
+def publish_category_change() -> None:
+    # category revenue rollups follow the hierarchy, cached answers are stale
+    bump_data_version()
+    # product details embed their category
+    invalidate_all_products()
+    try:
+        get_redis().publish(settings.REDIS_CATEGORY_INVALIDATION, "category")
+    except RedisError as e:
+        logger.warning("Unable to publish category tree invalidation: %s", e)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_category_writes(session):
+    session.info.pop("category_tree_dirty", None)
+
+
+async def listen_for_category_invalidation() -> None:
+    """drop the tree when another worker committed a category change"""
+    subscription = await broadcaster.subscribe_with_retry(
+        settings.REDIS_CATEGORY_INVALIDATION
+    )
+    try:
+        while True:
+            if await subscription.get(timeout=60):
+                invalidate_category_tree()
+    except asyncio.CancelledError:
+        broadcaster.unsubscribe(subscription)
+        raise
@@ -13,6 +13,11 @@ class Settings(BaseSettings):
     PROJECT_AUDIENCE: str = "Forsit"
 
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
     REDIS_URL: str = os.getenv("REDIS_URL")
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
@@ -26,6 +31,83 @@ class Settings(BaseSettings):
     REDIS_LOW_INVENTORY: str = os.getenv("REDIS_LOW_INVENTORY")
     KAFKA_TOPIC_SALES: str = os.getenv("KAFKA_TOPIC_SALES")
     REDIS_QUEUE_ORDER: str = os.getenv("REDIS_QUEUE_ORDER")
+    KAFKA_PRODUCER_LINGER_MS: int = int(os.getenv("KAFKA_PRODUCER_LINGER_MS", "5"))
+    KAFKA_PRODUCER_BATCH_BYTES: int = int(
+        os.getenv("KAFKA_PRODUCER_BATCH_BYTES", "65536")
+    )
+    KAFKA_PRODUCER_QUEUE_SIZE: int = int(
+        os.getenv("KAFKA_PRODUCER_QUEUE_SIZE", "10000")
+    )
+    KAFKA_PRODUCER_DRAIN_BATCH: int = int(
+        os.getenv("KAFKA_PRODUCER_DRAIN_BATCH", "500")
+    )
+    SALES_CONSUMER_BATCH_SIZE: int = int(
+        os.getenv("SALES_CONSUMER_BATCH_SIZE", "500")
+    )
+    SALES_CONSUMER_FLUSH_INTERVAL_MS: int = int(
+        os.getenv("SALES_CONSUMER_FLUSH_INTERVAL_MS", "1000")
+    )
+    SALES_CONSUMER_MAX_ATTEMPTS: int = int(
+        os.getenv("SALES_CONSUMER_MAX_ATTEMPTS", "3")
+    )
+    SALES_CACHE_TTL_SECONDS: int = int(os.getenv("SALES_CACHE_TTL_SECONDS", "300"))
+    SNAPSHOT_WINDOW: str = os.getenv("SNAPSHOT_WINDOW", "count")
+    SNAPSHOT_BATCH_SIZE: int = int(os.getenv("SNAPSHOT_BATCH_SIZE", "10"))
+    SNAPSHOT_MAX_WAIT_SECONDS: int = int(os.getenv("SNAPSHOT_MAX_WAIT_SECONDS", "60"))
+    LOW_STOCK_THRESHOLD: int = int(os.getenv("LOW_STOCK_THRESHOLD", "20"))
+    SSE_CLIENT_QUEUE_SIZE: int = int(os.getenv("SSE_CLIENT_QUEUE_SIZE", "100"))
+    SSE_HEARTBEAT_SECONDS: int = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    REDIS_SESSION_INVALIDATION: str = os.getenv(
+        "REDIS_SESSION_INVALIDATION", "CHANNEL_SESSION_INVALIDATION"
+    )
+    SESSION_CACHE_SIZE: int = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+    SESSION_CACHE_TTL_SECONDS: int = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "300"))
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    ORDERS_BULK_MAX_SIZE: int = int(os.getenv("ORDERS_BULK_MAX_SIZE", "500"))
+    FLASH_SALES_ENABLED: bool = (
+        os.getenv("FLASH_SALES_ENABLED", "false").lower() == "true"
+    )
+    FLASH_RECONCILE_INTERVAL_MS: int = int(
+        os.getenv("FLASH_RECONCILE_INTERVAL_MS", "500")
+    )
+    FLASH_RECONCILE_BATCH_SIZE: int = int(
+        os.getenv("FLASH_RECONCILE_BATCH_SIZE", "1000")
+    )
+    FLASH_DRIFT_CHECK_SECONDS: int = int(os.getenv("FLASH_DRIFT_CHECK_SECONDS", "60"))
+    REDIS_CATEGORY_INVALIDATION: str = os.getenv(
+        "REDIS_CATEGORY_INVALIDATION", "CHANNEL_CATEGORY_INVALIDATION"
+    )
+    CATEGORY_TREE_TTL_SECONDS: int = int(os.getenv("CATEGORY_TREE_TTL_SECONDS", "300"))
+    REDIS_PRODUCT_INVALIDATION: str = os.getenv(
+        "REDIS_PRODUCT_INVALIDATION", "CHANNEL_PRODUCT_INVALIDATION"
+    )
+    PRODUCT_CACHE_LOCAL_SIZE: int = int(os.getenv("PRODUCT_CACHE_LOCAL_SIZE", "1000"))
+    PRODUCT_CACHE_LOCAL_TTL_SECONDS: int = int(
+        os.getenv("PRODUCT_CACHE_LOCAL_TTL_SECONDS", "30")
+    )
+    PRODUCT_CACHE_TTL_SECONDS: int = int(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "300"))
+    PRODUCT_CACHE_MISSING_TTL_SECONDS: int = int(
+        os.getenv("PRODUCT_CACHE_MISSING_TTL_SECONDS", "60")
+    )
+    CONSUMER_STATS_INTERVAL_SECONDS: int = int(
+        os.getenv("CONSUMER_STATS_INTERVAL_SECONDS", "5")
+    )
+    CONSUMER_LAG_THRESHOLD: int = int(os.getenv("CONSUMER_LAG_THRESHOLD", "1000"))
+    CONSUMER_STALL_SECONDS: int = int(os.getenv("CONSUMER_STALL_SECONDS", "60"))
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_SAMPLE_EVERY: int = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+    EVENT_BUS_TRANSPORT: str = os.getenv("EVENT_BUS_TRANSPORT", "kafka")
+    EVENT_BUS_REDIS_MAXLEN: int = int(os.getenv("EVENT_BUS_REDIS_MAXLEN", "100000"))
+    EVENT_BUS_REDIS_CLAIM_IDLE_MS: int = int(
+        os.getenv("EVENT_BUS_REDIS_CLAIM_IDLE_MS", "60000")
+    )
+    EVENT_BUS_MEMORY_MAX_EVENTS: int = int(
+        os.getenv("EVENT_BUS_MEMORY_MAX_EVENTS", "100000")
+    )
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,161 @@
+import logging
+import time
+from typing import Dict, List
+
+from app.core.config import settings
+from app.core.event_bus import EventConsumer
+from app.core.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+KAFKA_MESSAGES_CONSUMED = Counter(
+    "kafka_messages_consumed_total", "Messages polled from the event bus", ("consumer",)
+)
+KAFKA_MESSAGES_PER_SECOND = Gauge(
+    "kafka_consumer_messages_per_second",
+    "Messages processed per second over the last stats interval",
+    ("consumer",),
+)
+KAFKA_COMMITTED_OFFSET = Gauge(
+    "kafka_consumer_committed_offset",
+    "Last committed offset of the consumer group",
+    ("consumer", "partition"),
+)
+KAFKA_END_OFFSET = Gauge(
+    "kafka_consumer_end_offset",
+    "High watermark of the partition",
+    ("consumer", "partition"),
+)
+KAFKA_CONSUMER_LAG = Gauge(
+    "kafka_consumer_lag",
+    "Messages between the committed offset and the partition end offset",
+    ("consumer", "partition"),
+)
+KAFKA_PROCESSING_SECONDS = Histogram(
+    "kafka_message_processing_seconds",
+    "Processing time per message, a batch split evenly over its messages",
+    ("consumer",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+KAFKA_EVENT_AGE_SECONDS = Histogram(
+    "kafka_event_age_seconds",
+    "Time from producing an event until it was processed",
+    ("consumer",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0),
+)
+
+MONITORS: Dict[str, "ConsumerMonitor"] = {}
+
+
+class ConsumerMonitor:
+    """
+    Tracks one consumer from its own thread, the event bus consumers are not
+    thread safe. Offsets are read every CONSUMER_STATS_INTERVAL_SECONDS and
+    published as an immutable snapshot, which `/health/consumers` reads
+    without touching the consumer.
+    """
+
+    def __init__(self, name: str, consumer: EventConsumer):
+        self.name = name
+        self.consumer = consumer
+        self.processed = 0
+        self.window_started = time.monotonic()
+        self.last_poll = time.monotonic()
+        self.refreshed_at = time.monotonic()
+        self.snapshot: dict = {
+            "partitions": [],
+            "lag": None,
+            "messages_per_second": 0,
+        }
+        MONITORS[name] = self
+
+    def polled(self, records: Dict) -> None:
+        self.last_poll = time.monotonic()
+        KAFKA_MESSAGES_CONSUMED.labels(consumer=self.name).inc(
+            sum(len(messages) for messages in records.values())
+        )
+        interval = settings.CONSUMER_STATS_INTERVAL_SECONDS
+        if self.last_poll - self.window_started >= interval:
+            self.refresh()
+
+    def processed_batch(self, messages: List, seconds: float) -> None:
+        if not messages:
+            return
+        now_ms = time.time() * 1000
+        per_message = seconds / len(messages)
+        processing = KAFKA_PROCESSING_SECONDS.labels(consumer=self.name)
+        age = KAFKA_EVENT_AGE_SECONDS.labels(consumer=self.name)
+        for message in messages:
+            processing.observe(per_message)
+            # timestamp is the producer create time unless the topic is
+            # configured with LogAppendTime, both are fine for an age
+            if message.timestamp and message.timestamp > 0:
+                age.observe(max(now_ms - message.timestamp, 0) / 1000)
+        self.processed += len(messages)
+
+    def refresh(self) -> None:
+        now = time.monotonic()
+        rate = self.processed / max(now - self.window_started, 1e-9)
+        self.processed, self.window_started = 0, now
+        self.refreshed_at = now
+        KAFKA_MESSAGES_PER_SECOND.labels(consumer=self.name).set(rate)
+
+        partitions = []
+        try:
+            for offsets in self.consumer.offsets():
+                partition = offsets["partition"]
+                committed, end = offsets["committed"], offsets["end"]
+                lag = None
+                if end is not None:
+                    KAFKA_END_OFFSET.labels(
+                        consumer=self.name, partition=partition
+                    ).set(end)
+                # nothing committed yet says nothing about the lag, a new group
+                # on an old topic would look like it is behind by everything
+                if end is not None and committed is not None:
+                    lag = end - committed
+                    KAFKA_CONSUMER_LAG.labels(
+                        consumer=self.name, partition=partition
+                    ).set(lag)
+                if committed is not None:
+                    KAFKA_COMMITTED_OFFSET.labels(
+                        consumer=self.name, partition=partition
+                    ).set(committed)
+                partitions.append(
+                    {
+                        "partition": partition,
+                        "committed": committed,
+                        "end": end,
+                        "lag": lag,
+                    }
+                )
+        except Exception as e:
+            logger.warning("Unable to read %s consumer offsets: %s", self.name, e)
+            partitions = self.snapshot["partitions"]
+
+        known = [p["lag"] for p in partitions if p["lag"] is not None]
+        self.snapshot = {
+            "partitions": partitions,
+            "lag": sum(known) if known else None,
+            "messages_per_second": round(rate, 2),
+        }
+
+    def health(self) -> dict:
+        snapshot = self.snapshot
+        since_poll = time.monotonic() - self.last_poll
+        lag = snapshot["lag"]
+        stalled = since_poll > settings.CONSUMER_STALL_SECONDS
+        lagging = lag is not None and lag > settings.CONSUMER_LAG_THRESHOLD
+        return {
+            **snapshot,
+            "seconds_since_poll": round(since_poll, 1),
+            # offsets are read by the consumer thread between polls, while it
+            # is busy processing they stay as old as this
+            "seconds_since_refresh": round(time.monotonic() - self.refreshed_at, 1),
+            "lag_threshold": settings.CONSUMER_LAG_THRESHOLD,
+            "healthy": not stalled and not lagging,
+        }
+
+
+def consumer_health() -> Dict[str, dict]:
+    return {name: monitor.health() for name, monitor in MONITORS.items()}
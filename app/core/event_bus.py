@@ -0,0 +1,535 @@
+import datetime
+import decimal
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+EVENTS_EVICTED = Counter(
+    "event_bus_memory_evicted_total",
+    "Events dropped from the in-memory transport before every group read them",
+    ("topic",),
+)
+
+# called once per published event with the topic and the error, None on success
+DeliveryCallback = Callable[[str, Optional[Exception]], None]
+
+
+class Message(NamedTuple):
+    topic: str
+    partition: int
+    offset: Any
+    value: Any
+    # milliseconds since the epoch, when the event was published
+    timestamp: int
+
+
+def default_serializer(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def serialize_event(value: Any) -> bytes:
+    return json.dumps(value, default=default_serializer).encode("utf-8")
+
+
+def deserialize_event(raw: bytes) -> Any:
+    return json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+
+
+class EventConsumer(ABC):
+    """
+    Reads one topic as a member of a consumer group. Only ever used from the
+    thread that polls it.
+    """
+
+    @abstractmethod
+    def poll(self, timeout_ms: int, max_records: int) -> Dict[Any, List[Message]]:
+        """up to `max_records` messages per partition key, waits at most timeout"""
+
+    @abstractmethod
+    def commit(self) -> None:
+        """mark everything returned by `poll` so far as processed"""
+
+    @abstractmethod
+    def rewind(self, messages: List[Message]) -> None:
+        """deliver uncommitted `messages` again on the next poll"""
+
+    @abstractmethod
+    def offsets(self) -> List[dict]:
+        """committed and end offset per partition"""
+
+    def close(self) -> None:
+        pass
+
+
+class EventBus(ABC):
+    """
+    Transport for the order and sales events. Connections are opened on
+    first use, importing the app never touches a broker.
+    """
+
+    @abstractmethod
+    def publish(self, topic: str, value: Any, on_delivery: DeliveryCallback) -> None:
+        ...
+
+    def flush(self, timeout: float) -> None:
+        pass
+
+    @abstractmethod
+    def consumer(
+        self, topic: str, group: str, auto_commit: bool, max_poll_records: int
+    ) -> EventConsumer:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class KafkaEventConsumer(EventConsumer):
+    # kafka-python is imported where used, the other transports run without it
+
+    def __init__(
+        self, topic: str, group: str, auto_commit: bool, max_poll_records: int
+    ):
+        from kafka import KafkaConsumer
+
+        self._consumer = KafkaConsumer(
+            topic,
+            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+            value_deserializer=deserialize_event,
+            auto_offset_reset="earliest",
+            enable_auto_commit=auto_commit,
+            max_poll_records=max_poll_records,
+            group_id=group,
+        )
+
+    def poll(self, timeout_ms: int, max_records: int) -> Dict[Any, List[Message]]:
+        records = self._consumer.poll(timeout_ms=timeout_ms, max_records=max_records)
+        return {
+            tp: [
+                Message(m.topic, m.partition, m.offset, m.value, m.timestamp)
+                for m in messages
+            ]
+            for tp, messages in records.items()
+        }
+
+    def commit(self) -> None:
+        self._consumer.commit()
+
+    def rewind(self, messages: List[Message]) -> None:
+        from kafka import TopicPartition
+
+        first_offsets = {}
+        for message in messages:
+            tp = TopicPartition(message.topic, message.partition)
+            first_offsets[tp] = min(
+                first_offsets.get(tp, message.offset), message.offset
+            )
+        for tp, offset in first_offsets.items():
+            self._consumer.seek(tp, offset)
+
+    def offsets(self) -> List[dict]:
+        assigned = sorted(
+            self._consumer.assignment(), key=lambda tp: (tp.topic, tp.partition)
+        )
+        # the high watermark comes with every fetch response, only partitions
+        # not fetched from yet need a request
+        missing = [tp for tp in assigned if self._consumer.highwater(tp) is None]
+        end_offsets = self._consumer.end_offsets(missing) if missing else {}
+        partitions = []
+        for tp in assigned:
+            end = self._consumer.highwater(tp)
+            if end is None:
+                end = end_offsets.get(tp)
+            partitions.append(
+                {
+                    "partition": f"{tp.topic}-{tp.partition}",
+                    # cached after the first commit, a remote call only before it
+                    "committed": self._consumer.committed(tp),
+                    "end": end,
+                }
+            )
+        return partitions
+
+    def close(self) -> None:
+        self._consumer.close()
+
+
+class KafkaEventBus(EventBus):
+    def __init__(self):
+        self._producer = None
+        self._topics_ready = False
+        self._lock = threading.Lock()
+
+    def ensure_topics(self) -> None:
+        with self._lock:
+            if not self._topics_ready:
+                self.create_topics()
+                self._topics_ready = True
+
+    def create_topics(self) -> None:
+        """create topics on kafka if not exist"""
+        from kafka import KafkaAdminClient
+        from kafka.admin import NewTopic
+
+        try:
+            admin_client = KafkaAdminClient(
+                bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+                client_id="admin-client",
+            )
+            existing_topics = admin_client.list_topics()
+            topic_list = []
+            for topic_name in (settings.KAFKA_TOPIC_ORDER, settings.KAFKA_TOPIC_SALES):
+                if topic_name and topic_name not in existing_topics:
+                    logger.info("Creating topic %s", topic_name)
+                    topic_list.append(
+                        NewTopic(
+                            name=topic_name, num_partitions=1, replication_factor=1
+                        )
+                    )
+                elif topic_name:
+                    logger.debug("Topic %s already exists", topic_name)
+            if topic_list:
+                admin_client.create_topics(new_topics=topic_list, validate_only=False)
+                logger.info("Topics created")
+            admin_client.close()
+        except Exception:
+            logger.exception("Error creating Kafka topics")
+
+    @property
+    def producer(self):
+        if self._producer is None:
+            self.ensure_topics()
+            with self._lock:
+                if self._producer is None:
+                    from kafka import KafkaProducer
+
+                    self._producer = KafkaProducer(
+                        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+                        value_serializer=serialize_event,
+                        linger_ms=settings.KAFKA_PRODUCER_LINGER_MS,
+                        batch_size=settings.KAFKA_PRODUCER_BATCH_BYTES,
+                        connections_max_idle_ms=10000,
+                        request_timeout_ms=30000,
+                        metadata_max_age_ms=10000,
+                        retry_backoff_ms=1000,
+                    )
+        return self._producer
+
+    def publish(self, topic: str, value: Any, on_delivery: DeliveryCallback) -> None:
+        future = self.producer.send(topic, value)
+        future.add_callback(lambda _: on_delivery(topic, None))
+        future.add_errback(lambda e: on_delivery(topic, e))
+
+    def flush(self, timeout: float) -> None:
+        if self._producer is not None:
+            self._producer.flush(timeout)
+
+    def consumer(
+        self, topic: str, group: str, auto_commit: bool, max_poll_records: int
+    ) -> EventConsumer:
+        self.ensure_topics()
+        return KafkaEventConsumer(topic, group, auto_commit, max_poll_records)
+
+    def close(self) -> None:
+        if self._producer is not None:
+            self._producer.close()
+            self._producer = None
+
+
+class RedisStreamConsumer(EventConsumer):
+    """
+    Consumer group on a redis stream. Delivered entries stay pending until
+    acknowledged by `commit`. Every EVENT_BUS_REDIS_CLAIM_IDLE_MS the entries
+    other consumers of the group left pending that long are claimed and
+    delivered here, a worker that restarted comes back under a new name.
+    """
+
+    def __init__(self, redis, topic: str, group: str, auto_commit: bool):
+        self._redis = redis
+        self.topic = topic
+        self.group = group
+        self.auto_commit = auto_commit
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self._delivered: List[str] = []
+        # id to continue reading our own pending entries from, None once
+        # they were all delivered again
+        self._replay_from: Optional[str] = "0"
+        self._claimed: list = []
+        self._last_claim = 0.0
+        try:
+            redis.xgroup_create(topic, group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def poll(self, timeout_ms: int, max_records: int) -> Dict[Any, List[Message]]:
+        if self.auto_commit:
+            self.commit()
+        claim_every = settings.EVENT_BUS_REDIS_CLAIM_IDLE_MS / 1000
+        # claimed entries join our own pending ones, claim only after those
+        # were replayed so nothing is delivered twice
+        if self._replay_from is None and time.monotonic() >= (
+            self._last_claim + claim_every
+        ):
+            self._claim()
+
+        entries = self._claimed[:max_records]
+        del self._claimed[:max_records]
+        if not entries and self._replay_from is not None:
+            entries = self._read(self._replay_from, max_records, None)
+            self._replay_from = self._entry_id(entries[-1][0]) if entries else None
+        if not entries:
+            entries = self._read(">", max_records, timeout_ms or None)
+
+        messages = []
+        for entry_id, fields in entries:
+            entry_id = self._entry_id(entry_id)
+            self._delivered.append(entry_id)
+            if not fields:
+                # pending entry trimmed from the stream meanwhile, just ack it
+                continue
+            messages.append(
+                Message(
+                    topic=self.topic,
+                    partition=0,
+                    offset=entry_id,
+                    value=deserialize_event(fields[b"value"]),
+                    timestamp=int(entry_id.split("-")[0]),
+                )
+            )
+        return {self.topic: messages} if messages else {}
+
+    @staticmethod
+    def _entry_id(entry_id) -> str:
+        return entry_id.decode("utf-8") if isinstance(entry_id, bytes) else entry_id
+
+    def _claim(self) -> None:
+        self._last_claim = time.monotonic()
+        in_flight = set(self._delivered)
+        cursor = "0-0"
+        while True:
+            response = self._redis.xautoclaim(
+                self.topic,
+                self.group,
+                self.name,
+                min_idle_time=settings.EVENT_BUS_REDIS_CLAIM_IDLE_MS,
+                start_id=cursor,
+            )
+            cursor = self._entry_id(response[0])
+            self._claimed.extend(
+                entry
+                for entry in response[1]
+                if self._entry_id(entry[0]) not in in_flight
+            )
+            if cursor == "0-0":
+                break
+
+    def _read(self, stream_id: str, count: int, block: Optional[int]) -> list:
+        response = self._redis.xreadgroup(
+            self.group, self.name, {self.topic: stream_id}, count=count, block=block
+        )
+        return response[0][1] if response else []
+
+    def commit(self) -> None:
+        if self._delivered:
+            self._redis.xack(self.topic, self.group, *self._delivered)
+            self._delivered = []
+
+    def rewind(self, messages: List[Message]) -> None:
+        # the entries are still pending, claimed ones included, read them
+        # again from the start
+        self._delivered = []
+        self._claimed = []
+        self._replay_from = "0"
+
+    def offsets(self) -> List[dict]:
+        stream = self._redis.xinfo_stream(self.topic)
+        end = stream.get("entries-added", stream.get("length"))
+        committed = None
+        for group in self._redis.xinfo_groups(self.topic):
+            name = group["name"]
+            if isinstance(name, bytes):
+                name = name.decode("utf-8")
+            if name == self.group:
+                read = group.get("entries-read")
+                if read is not None:
+                    committed = read - group["pending"]
+        return [{"partition": self.topic, "committed": committed, "end": end}]
+
+
+class RedisStreamEventBus(EventBus):
+    def __init__(self):
+        from app.db.redis import get_redis
+
+        self._redis = get_redis()
+
+    def publish(self, topic: str, value: Any, on_delivery: DeliveryCallback) -> None:
+        try:
+            self._redis.xadd(
+                topic,
+                {"value": serialize_event(value)},
+                maxlen=settings.EVENT_BUS_REDIS_MAXLEN,
+                approximate=True,
+            )
+        except Exception as e:
+            on_delivery(topic, e)
+            return
+        on_delivery(topic, None)
+
+    def consumer(
+        self, topic: str, group: str, auto_commit: bool, max_poll_records: int
+    ) -> EventConsumer:
+        return RedisStreamConsumer(self._redis, topic, group, auto_commit)
+
+
+class _MemoryLog:
+    def __init__(self):
+        # offset of events[0], advances as old events are evicted
+        self.base = 0
+        self.events: List[Message] = []
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.events)
+
+
+class MemoryEventConsumer(EventConsumer):
+    def __init__(
+        self, bus: "MemoryEventBus", topic: str, group: str, auto_commit: bool
+    ):
+        self._bus = bus
+        self.topic = topic
+        self.group = group
+        self.auto_commit = auto_commit
+        self.position = bus.committed(topic, group)
+
+    def poll(self, timeout_ms: int, max_records: int) -> Dict[Any, List[Message]]:
+        if self.auto_commit:
+            self.commit()
+        messages = self._bus.read(self.topic, self.position, max_records, timeout_ms)
+        if messages:
+            self.position = messages[-1].offset + 1
+            return {self.topic: messages}
+        return {}
+
+    def commit(self) -> None:
+        self._bus.commit(self.topic, self.group, self.position)
+
+    def rewind(self, messages: List[Message]) -> None:
+        self.position = self._bus.committed(self.topic, self.group)
+
+    def offsets(self) -> List[dict]:
+        return [
+            {
+                "partition": self.topic,
+                "committed": self._bus.committed(self.topic, self.group),
+                "end": self._bus.end(self.topic),
+            }
+        ]
+
+
+class MemoryEventBus(EventBus):
+    """
+    Topics as bounded in-process logs. Events never leave the process, so
+    every worker consumes what it produced itself; for single process
+    deployments, tests and benchmarks that should not measure a broker.
+    """
+
+    def __init__(self):
+        self._logs: Dict[str, _MemoryLog] = {}
+        self._committed: Dict[tuple, int] = {}
+        self._changed = threading.Condition()
+
+    def _log(self, topic: str) -> _MemoryLog:
+        return self._logs.setdefault(topic, _MemoryLog())
+
+    def publish(self, topic: str, value: Any, on_delivery: DeliveryCallback) -> None:
+        try:
+            # the same round trip as the brokers, consumers get plain json
+            value = deserialize_event(serialize_event(value))
+        except TypeError as e:
+            on_delivery(topic, e)
+            return
+        with self._changed:
+            log = self._log(topic)
+            log.events.append(
+                Message(topic, 0, log.end, value, int(time.time() * 1000))
+            )
+            overflow = len(log.events) - settings.EVENT_BUS_MEMORY_MAX_EVENTS
+            if overflow > 0:
+                del log.events[:overflow]
+                log.base += overflow
+                EVENTS_EVICTED.labels(topic=topic).inc(overflow)
+            self._changed.notify_all()
+        on_delivery(topic, None)
+
+    def read(
+        self, topic: str, position: int, max_records: int, timeout_ms: int
+    ) -> List[Message]:
+        deadline = time.monotonic() + timeout_ms / 1000
+        with self._changed:
+            log = self._log(topic)
+            while log.end <= position:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._changed.wait(remaining)
+            start = max(position - log.base, 0)
+            return log.events[start : start + max_records]
+
+    def committed(self, topic: str, group: str) -> int:
+        with self._changed:
+            return max(self._committed.get((topic, group), 0), self._log(topic).base)
+
+    def commit(self, topic: str, group: str, position: int) -> None:
+        with self._changed:
+            self._committed[(topic, group)] = position
+
+    def end(self, topic: str) -> int:
+        with self._changed:
+            return self._log(topic).end
+
+    def consumer(
+        self, topic: str, group: str, auto_commit: bool, max_poll_records: int
+    ) -> EventConsumer:
+        return MemoryEventConsumer(self, topic, group, auto_commit)
+
+
+TRANSPORTS: Dict[str, Callable[[], EventBus]] = {
+    "kafka": KafkaEventBus,
+    "redis": RedisStreamEventBus,
+    "memory": MemoryEventBus,
+}
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """the transport selected by EVENT_BUS_TRANSPORT, created on first use"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                transport = settings.EVENT_BUS_TRANSPORT.lower()
+                if transport not in TRANSPORTS:
+                    raise ValueError(f"Unknown event bus transport: {transport}")
+                _bus = TRANSPORTS[transport]()
+    return _bus
@@ -0,0 +1,428 @@
+import json
+import logging
+import threading
+import uuid
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence
+
+from redis.exceptions import LockError
+from sqlalchemy import delete, func, insert, select, update
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+from app.db.redis import get_async_redis, get_redis
+from app.db.session import SessionLocal
+from app.models.flash_reconciled_batch import FlashReconciledBatch
+from app.models.inventory import Inventory as InventoryModel
+from app.models.inventory_history import InventoryHistory as InventoryHistoryModel
+
+logger = logging.getLogger(__name__)
+
+FLAGGED_KEY = "flash:products"
+RESERVATIONS_KEY = "flash:reservations"
+# the batch being written back, kept until the database commit went through
+PROCESSING_KEY = "flash:reservations:processing"
+PROCESSING_ID_KEY = "flash:reservations:processing:id"
+RECONCILE_LOCK_KEY = "flash:reconcile:lock"
+# applied batch ids are kept this long, only the batch in processing is ever
+# looked up
+RECONCILED_BATCH_RETENTION = timedelta(days=1)
+
+FLASH_RESERVATIONS = Counter(
+    "flash_reservations_total",
+    "Flash sale stock reservations by outcome",
+    ("outcome",),
+)
+FLASH_RECONCILED = Counter(
+    "flash_reservations_reconciled_total",
+    "Reservation records written back to inventory and inventory history",
+)
+FLASH_PENDING = Gauge(
+    "flash_reservations_pending", "Reservation records waiting for reconciliation"
+)
+FLASH_STOCK_DRIFT = Gauge(
+    "flash_stock_drift",
+    "Redis stock minus database stock plus pending reservations",
+    ("product_id",),
+)
+
+# KEYS: stock key per product, then the flagged set and the reservation list
+# ARGV: product id and quantity per product, then one record per product,
+# then the ids of products that must not be flagged
+# returns {0, 0} on success, otherwise {position, available} of the first
+# product that cannot be served, available is -2 when its flag is not the
+# expected one, positions past the reserved products are the unflagged ones
+RESERVE_SCRIPT = """
+local n = #KEYS - 2
+local flagged, queue = KEYS[n + 1], KEYS[n + 2]
+for i = 3 * n + 1, #ARGV do
+    if redis.call('SISMEMBER', flagged, ARGV[i]) == 1 then
+        return {i - 2 * n, -2}
+    end
+end
+for i = 1, n do
+    if redis.call('SISMEMBER', flagged, ARGV[i]) == 0 then
+        return {i, -2}
+    end
+    local stock = tonumber(redis.call('GET', KEYS[i]) or '0')
+    if stock < tonumber(ARGV[n + i]) then
+        return {i, stock}
+    end
+end
+for i = 1, n do
+    redis.call('DECRBY', KEYS[i], ARGV[n + i])
+    redis.call('RPUSH', queue, ARGV[2 * n + i])
+end
+return {0, 0}
+"""
+
+# KEYS: stock key per product, then the reservation list
+# ARGV: quantity per product, then one record per product
+# gives stock back, skipping products that left flash mode meanwhile
+RESTOCK_SCRIPT = """
+local n = #KEYS - 1
+for i = 1, n do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('INCRBY', KEYS[i], ARGV[i])
+    end
+    redis.call('RPUSH', KEYS[n + 1], ARGV[n + i])
+end
+return n
+"""
+
+# KEYS: reservation list, processing list, processing batch id
+# ARGV: batch size, id for a new batch
+# moves the head of the reservation list to the processing list and returns
+# {batch id, records}, unless a batch is still there from a reconciler that
+# died mid-way, that one is returned with its original id
+TAKE_BATCH_SCRIPT = """
+local pending = redis.call('LRANGE', KEYS[2], 0, -1)
+if #pending > 0 then
+    local id = redis.call('GET', KEYS[3])
+    if not id then
+        id = ARGV[2]
+        redis.call('SET', KEYS[3], id)
+    end
+    return {id, pending}
+end
+local batch = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+-- unpack in chunks, lua limits how many values go on the stack at once
+for i = 1, #batch, 1000 do
+    redis.call('RPUSH', KEYS[2], unpack(batch, i, math.min(i + 999, #batch)))
+end
+if #batch > 0 then
+    redis.call('LTRIM', KEYS[1], #batch, -1)
+    redis.call('SET', KEYS[3], ARGV[2])
+end
+return {ARGV[2], batch}
+"""
+
+# registering only hashes the source, nothing is sent to redis here
+reserve_script = get_async_redis().register_script(RESERVE_SCRIPT)
+restock_script = get_async_redis().register_script(RESTOCK_SCRIPT)
+take_batch_script = get_redis().register_script(TAKE_BATCH_SCRIPT)
+
+
+class FlashStockShort(Exception):
+    def __init__(self, product_id: uuid.UUID, available: int):
+        super().__init__(f"Not enough flash stock for product {product_id}")
+        self.product_id = product_id
+        self.available = available
+
+
+class FlashModeChanged(Exception):
+    """a product left flash mode between the lookup and the reservation"""
+
+
+def stock_key(product_id) -> str:
+    return f"flash:stock:{product_id}"
+
+
+def reservation_record(product_id, delta: int, changed_by, reason: str) -> str:
+    return json.dumps(
+        {
+            "product_id": str(product_id),
+            "delta": delta,
+            "changed_by": str(changed_by),
+            "reason": reason,
+        }
+    )
+
+
+async def flagged_products(product_ids: List[uuid.UUID]) -> List[uuid.UUID]:
+    # with flash sales off nothing is ever flagged, orders skip redis
+    if not product_ids or not settings.FLASH_SALES_ENABLED:
+        return []
+    members = await get_async_redis().smismember(
+        FLAGGED_KEY, [str(product_id) for product_id in product_ids]
+    )
+    return [product_id for product_id, flagged in zip(product_ids, members) if flagged]
+
+
+async def reserve(
+    quantities: Dict[uuid.UUID, int],
+    changed_by,
+    reason: str = "Order placed",
+    unflagged: Sequence[uuid.UUID] = (),
+) -> None:
+    """
+    Atomically take stock for every product of `quantities` or for none, in
+    the same round trip check that no product of `unflagged` is flagged.
+    Raises FlashStockShort or FlashModeChanged when nothing was taken.
+    """
+    product_ids = sorted(quantities)
+    checked_ids = product_ids + list(unflagged)
+    keys = [stock_key(p) for p in product_ids] + [FLAGGED_KEY, RESERVATIONS_KEY]
+    args = (
+        [str(p) for p in product_ids]
+        + [quantities[p] for p in product_ids]
+        + [
+            reservation_record(p, -quantities[p], changed_by, reason)
+            for p in product_ids
+        ]
+        + [str(p) for p in unflagged]
+    )
+    position, available = await reserve_script(keys=keys, args=args)
+    if position == 0:
+        if product_ids:
+            FLASH_RESERVATIONS.labels(outcome="reserved").inc()
+        return
+    if available == -2:
+        FLASH_RESERVATIONS.labels(outcome="mode_changed").inc()
+        raise FlashModeChanged(checked_ids[position - 1])
+    FLASH_RESERVATIONS.labels(outcome="short").inc()
+    raise FlashStockShort(product_ids[position - 1], max(available, 0))
+
+
+async def restock(quantities: Dict[uuid.UUID, int], changed_by, reason: str) -> None:
+    """give stock back to redis and record it for reconciliation"""
+    product_ids = sorted(quantities)
+    keys = [stock_key(p) for p in product_ids] + [RESERVATIONS_KEY]
+    args = [quantities[p] for p in product_ids] + [
+        reservation_record(p, quantities[p], changed_by, reason) for p in product_ids
+    ]
+    await restock_script(keys=keys, args=args)
+
+
+def enable_flash_mode(product_id: uuid.UUID) -> Optional[int]:
+    """
+    Move the stock of a product into redis, returns the stock now held there
+    or None when the product has no inventory. The flag is checked and set
+    while the latest inventory row is locked, so concurrent enables copy the
+    stock only once. Orders decrementing in postgres re-check the flag while
+    they hold the same row lock, see `place_order`.
+    """
+    redis = get_redis()
+    db = SessionLocal()
+    try:
+        inventory = (
+            db.query(InventoryModel)
+            .filter(InventoryModel.product_id == product_id)
+            .order_by(InventoryModel.created_at.desc())
+            .with_for_update()
+            .first()
+        )
+        if inventory is None:
+            return None
+        if redis.sismember(FLAGGED_KEY, str(product_id)):
+            # enabled already, redis holds the live stock
+            return int(redis.get(stock_key(product_id)) or 0)
+        redis.set(stock_key(product_id), inventory.quantity or 0)
+        redis.sadd(FLAGGED_KEY, str(product_id))
+        db.commit()
+        return inventory.quantity or 0
+    finally:
+        db.close()
+
+
+def disable_flash_mode(product_id: uuid.UUID) -> None:
+    """stop reserving in redis and write every pending reservation back"""
+    redis = get_redis()
+    redis.srem(FLAGGED_KEY, str(product_id))
+    # the reserve script checks the flag, so every record of this product is
+    # already queued, draining that many records is enough even when the
+    # reconciler thread takes some of them and others keep arriving
+    remaining = redis.llen(RESERVATIONS_KEY) + redis.llen(PROCESSING_KEY)
+    while remaining > 0:
+        taken = reconcile_once(blocking_timeout=None)
+        if not taken:
+            break
+        remaining -= taken
+    redis.delete(stock_key(product_id))
+
+
+def apply_reservations(db, records: List[dict]) -> int:
+    product_ids = sorted({uuid.UUID(record["product_id"]) for record in records})
+    inventories: Dict[uuid.UUID, InventoryModel] = {}
+    for inventory in db.scalars(
+        select(InventoryModel)
+        .where(InventoryModel.product_id.in_(product_ids))
+        .order_by(InventoryModel.product_id, InventoryModel.created_at.desc())
+        .with_for_update()
+    ):
+        inventories.setdefault(inventory.product_id, inventory)
+
+    quantities = {
+        product_id: inventory.quantity or 0
+        for product_id, inventory in inventories.items()
+    }
+    history_rows = []
+    for record in records:
+        product_id = uuid.UUID(record["product_id"])
+        inventory = inventories.get(product_id)
+        if inventory is None:
+            logger.warning(
+                "Dropping flash reservation for product without inventory",
+                extra={"record": record},
+            )
+            continue
+        previous_quantity = quantities[product_id]
+        quantities[product_id] += record["delta"]
+        history_rows.append(
+            {
+                "id": uuid.uuid4(),
+                "inventory_id": inventory.id,
+                "previous_quantity": previous_quantity,
+                "new_quantity": quantities[product_id],
+                "change_reason": record["reason"],
+                "changed_by": record["changed_by"],
+            }
+        )
+
+    if history_rows:
+        db.execute(
+            update(InventoryModel),
+            [
+                {"id": inventory.id, "quantity": quantities[product_id]}
+                for product_id, inventory in inventories.items()
+            ],
+        )
+        db.execute(insert(InventoryHistoryModel), history_rows)
+    return len(history_rows)
+
+
+def reconcile_once(blocking_timeout: Optional[float] = 5) -> int:
+    """
+    Write one batch of reservations back to postgres, returns records taken.
+    The batch moves to PROCESSING_KEY first and is only deleted after the
+    commit, a batch left there by a crash or a failed commit is retried
+    before anything new is taken. Returns 0 when the lock is not acquired
+    within blocking_timeout seconds, None waits until it is.
+    """
+    redis = get_redis()
+    try:
+        with redis.lock(
+            RECONCILE_LOCK_KEY, timeout=60, blocking_timeout=blocking_timeout
+        ):
+            batch_id, raw = take_batch_script(
+                keys=[RESERVATIONS_KEY, PROCESSING_KEY, PROCESSING_ID_KEY],
+                args=[settings.FLASH_RECONCILE_BATCH_SIZE, str(uuid.uuid4())],
+            )
+            if not raw:
+                FLASH_PENDING.set(0)
+                return 0
+
+            batch_id = uuid.UUID(batch_id.decode("utf-8"))
+            db = SessionLocal()
+            try:
+                applied = 0
+                # committed before a crash kept it in redis, only drop it now
+                if db.get(FlashReconciledBatch, batch_id) is None:
+                    applied = apply_reservations(db, [json.loads(r) for r in raw])
+                    db.add(FlashReconciledBatch(batch_id=batch_id))
+                    db.execute(
+                        delete(FlashReconciledBatch).where(
+                            FlashReconciledBatch.applied_at
+                            < func.now() - RECONCILED_BATCH_RETENTION
+                        )
+                    )
+                    db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            redis.delete(PROCESSING_KEY, PROCESSING_ID_KEY)
+
+            FLASH_RECONCILED.inc(applied)
+            FLASH_PENDING.set(redis.llen(RESERVATIONS_KEY))
+            return len(raw)
+    except LockError:
+        return 0
+
+
+def detect_drift() -> Dict[str, dict]:
+    """
+    Compare redis stock with database stock plus the reservations not yet
+    reconciled, for every flagged product. Holds the reconcile lock so no
+    batch is half applied while comparing.
+    """
+    redis = get_redis()
+    report = {}
+    with redis.lock(RECONCILE_LOCK_KEY, timeout=60, blocking_timeout=10):
+        product_ids = sorted(p.decode("utf-8") for p in redis.smembers(FLAGGED_KEY))
+        if not product_ids:
+            return report
+
+        pipe = redis.pipeline(transaction=True)
+        pipe.mget([stock_key(p) for p in product_ids])
+        pipe.lrange(PROCESSING_KEY, 0, -1)
+        pipe.lrange(RESERVATIONS_KEY, 0, -1)
+        stocks, processing_raw, reservations_raw = pipe.execute()
+
+        pending: Dict[str, int] = {}
+        for raw in processing_raw + reservations_raw:
+            record = json.loads(raw)
+            pending[record["product_id"]] = (
+                pending.get(record["product_id"], 0) + record["delta"]
+            )
+
+        db = SessionLocal()
+        try:
+            database = {}
+            for inventory in db.scalars(
+                select(InventoryModel)
+                .where(InventoryModel.product_id.in_(product_ids))
+                .order_by(InventoryModel.product_id, InventoryModel.created_at.desc())
+            ):
+                database.setdefault(str(inventory.product_id), inventory.quantity or 0)
+        finally:
+            db.close()
+
+    for product_id, stock in zip(product_ids, stocks):
+        redis_stock = int(stock or 0)
+        expected = database.get(product_id, 0) + pending.get(product_id, 0)
+        drift = redis_stock - expected
+        FLASH_STOCK_DRIFT.labels(product_id=product_id).set(drift)
+        if drift:
+            logger.warning(
+                "Flash stock drift", extra={"product_id": product_id, "drift": drift}
+            )
+        report[product_id] = {
+            "redis": redis_stock,
+            "database": database.get(product_id, 0),
+            "pending": pending.get(product_id, 0),
+            "drift": drift,
+        }
+    return report
+
+
+def reconcile_flash_reservations(stop_event: threading.Event) -> None:
+    """reconciler thread, drains reservations and checks drift when idle"""
+    if not settings.FLASH_SALES_ENABLED:
+        return
+    interval = settings.FLASH_RECONCILE_INTERVAL_MS / 1000
+    drift_every = settings.FLASH_DRIFT_CHECK_SECONDS
+    idle_for = 0.0
+    while not stop_event.is_set():
+        try:
+            taken = reconcile_once()
+            if taken >= settings.FLASH_RECONCILE_BATCH_SIZE:
+                continue
+            idle_for += interval
+            if idle_for >= drift_every:
+                idle_for = 0.0
+                detect_drift()
+        except Exception:
+            logger.exception("Flash reservation reconciliation failed")
+        stop_event.wait(interval)
@@ -0,0 +1,72 @@
+import time
+from typing import Callable, Dict
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import Counter, Histogram
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its response finished",
+    ("method", "route"),
+)
+HTTP_RESPONSES = Counter(
+    "http_responses_total",
+    "Responses by route and status code",
+    ("method", "route", "status"),
+)
+
+# requests no route matched share one label, so scanners cannot blow up
+# the number of series with random paths
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware timing every http request per route template, e.g.
+    `/api/v1/product/{product_sku}`. Avoids BaseHTTPMiddleware so streaming
+    responses are not buffered and no extra task is spawned per request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._templates: Dict[Callable, str] = {}
+
+    def route_template(self, scope: Scope) -> str:
+        app = scope.get("app")
+        for route in getattr(app, "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", UNMATCHED_ROUTE)
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            # the router stores the matched endpoint in the scope, a template
+            # is looked up once per endpoint rather than once per request
+            endpoint = scope.get("endpoint")
+            route = self._templates.get(endpoint)
+            if route is None:
+                route = self.route_template(scope)
+                if endpoint is not None:
+                    self._templates[endpoint] = route
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.labels(method=method, route=route).observe(elapsed)
+            HTTP_RESPONSES.labels(method=method, route=route, status=status).inc()
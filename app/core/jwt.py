@@ -25,7 +25,6 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
 def decode_jwt_token(token: str):
     try:
-        print(token)
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
@@ -1,63 +1,119 @@
-from datetime import datetime
-from kafka import KafkaConsumer
+from datetime import datetime, timezone
 import json
+import logging
 import uuid
-from typing import Any
+from typing import Any, Iterable, List, Optional, Tuple
 import time
+from sqlalchemy.orm import joinedload
 
 from app.core.config import settings
+from app.core.logging import SAMPLED
+from app.core.consumer_metrics import ConsumerMonitor
+from app.core.event_bus import get_event_bus
+from app.core.metrics import REGISTRY, Gauge, Histogram
 from app.db.redis import get_redis
 from app.db.session import SessionLocal
 from app.models.inventory import Inventory
 from app.models.sales_snapshot import SalesSnapshot
-from app.schema.inventory import InventoryDetails as InventoryDetailsSchema
+from app.schema.inventory import InventoryAlert as InventoryAlertSchema
 
+logger = logging.getLogger(__name__)
 
-consumer = KafkaConsumer(
-    settings.KAFKA_TOPIC_ORDER,
-    bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-    value_deserializer=lambda m: json.loads(m.decode("utf-8")),
-    auto_offset_reset="earliest",
-    enable_auto_commit=True,
-    group_id=settings.KAFKA_GROUP_ID,
+ORDER_POLL_MAX_RECORDS = 500
+
+SNAPSHOT_QUEUE_DEPTH = Gauge(
+    "snapshot_queue_depth", "Orders waiting in REDIS_QUEUE_ORDER for a snapshot"
+)
+SNAPSHOT_FLUSH_SECONDS = Histogram(
+    "snapshot_flush_duration_seconds",
+    "Time to aggregate and store one snapshot window",
+    ("interval",),
 )
 
 
+def collect_snapshot_queue_depth() -> None:
+    SNAPSHOT_QUEUE_DEPTH.set(get_redis().llen(settings.REDIS_QUEUE_ORDER))
+
+
+REGISTRY.add_collector(collect_snapshot_queue_depth)
+
+
 def consume_order_events(stop_event):
+    consumer = get_event_bus().consumer(
+        settings.KAFKA_TOPIC_ORDER,
+        settings.KAFKA_GROUP_ID,
+        auto_commit=True,
+        max_poll_records=ORDER_POLL_MAX_RECORDS,
+    )
+    monitor = ConsumerMonitor("order", consumer)
     while not stop_event.is_set():
-        for message in consumer:
-            order_data = message.value
-            print("Received order event:", order_data)
+        records = consumer.poll(timeout_ms=1000, max_records=ORDER_POLL_MAX_RECORDS)
+        monitor.polled(records)
+        messages = [m for partition in records.values() for m in partition]
+        if not messages:
+            continue
+
+        started = time.perf_counter()
+        orders = [m.value for m in messages]
+        for order_data in orders:
+            logger.debug(
+                "Received order event",
+                extra={**SAMPLED, "order_number": order_data.get("order_number")},
+            )
             publish_redis_event(data=order_data, channel=settings.REDIS_INCOMING_ORDER)
             send_orders_queue_for_snapshot(
                 data=order_data, name=settings.REDIS_QUEUE_ORDER
             )
-            for item in order_data.get("items", []):
-                product_id = item.get("product_id")
-                inventory_detail = get_product_stock(product_id)
-                if inventory_detail.quantity <= 20:
-                    publish_redis_event(
-                        data=inventory_detail, channel=settings.REDIS_LOW_INVENTORY
-                    )
-                    print("Low stock warning: " + product_id)
-            if stop_event.is_set():
-                break
-
-
-def get_product_stock(product_id: str) -> InventoryDetailsSchema:
+        check_low_stock(orders)
+        monitor.processed_batch(messages, time.perf_counter() - started)
+    consumer.close()
+
+
+def check_low_stock(orders: List[Any]) -> None:
+    """one inventory lookup for every product touched by a polled batch"""
+    product_ids = {
+        item.get("product_id")
+        for order_data in orders
+        for item in order_data.get("items", [])
+        if item.get("product_id")
+    }
+    if not product_ids:
+        return
+
+    for inventory_detail in get_products_stock(product_ids):
+        if inventory_detail.quantity <= settings.LOW_STOCK_THRESHOLD:
+            publish_redis_event(
+                data=inventory_detail, channel=settings.REDIS_LOW_INVENTORY
+            )
+            logger.warning(
+                "Low stock",
+                extra={
+                    "product_id": inventory_detail.product_id,
+                    "quantity": inventory_detail.quantity,
+                },
+            )
+
+
+def get_products_stock(product_ids: Iterable[str]) -> List[InventoryAlertSchema]:
     db = SessionLocal()
     try:
-        inventory = (
-            db.query(Inventory).filter(Inventory.product_id == product_id).first()
+        inventories = (
+            db.query(Inventory)
+            .options(joinedload(Inventory.product))
+            .filter(Inventory.product_id.in_(list(product_ids)))
+            .order_by(Inventory.product_id, Inventory.created_at.desc())
+            .all()
         )
-        if inventory:
-            return InventoryDetailsSchema.model_validate(
-                inventory, from_attributes=True
-            )
-        return None
+        latest = {}
+        for inventory in inventories:
+            latest.setdefault(inventory.product_id, inventory)
+        return [
+            InventoryAlertSchema.model_validate(inventory, from_attributes=True)
+            for inventory in latest.values()
+        ]
     except Exception as e:
-        print(f"Error fetching product stock")
-        return None
+        logger.exception("Error fetching product stock")
+        return []
     finally:
         db.close()
 
@@ -68,7 +124,7 @@ def default_redis_serializer(obj):
     if isinstance(obj, uuid.UUID):
         return str(obj)
     if isinstance(obj, datetime):
-        return str(datetime)
+        return obj.isoformat()
     raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
@@ -79,42 +135,140 @@ def publish_redis_event(data: Any, channel: str) -> None:
         if hasattr(data, "model_dump"):
             data = data.model_dump()
         redis.publish(channel, json.dumps(data, default=default_redis_serializer))
-        print("publish to redis channel: ", channel)
-    except Exception as e:
-        print(e)
-        print("unable to publish event to redis channel")
+        logger.debug(
+            "Published to redis channel", extra={**SAMPLED, "channel": channel}
+        )
+    except Exception:
+        logger.exception("Unable to publish event to redis channel %s", channel)
 
 
 def send_orders_queue_for_snapshot(data: Any, name: str) -> None:
     redis = get_redis()
-    print("pushing to redis queue: ", name)
     try:
         if hasattr(data, "model_dump"):
             data = data.model_dump()
         redis.rpush(name, json.dumps(data, default=default_redis_serializer))
-        print(f"Pushed order to Redis queue: {name}")
-    except Exception as e:
-        print(f"Kafka connection/send failed: {e}")
+        logger.debug("Pushed order to redis queue", extra={**SAMPLED, "queue": name})
+    except Exception:
+        logger.exception("Unable to push order to redis queue %s", name)
+
 
+SNAPSHOT_WINDOW_SECONDS = {"minute": 60, "hour": 3600}
+SNAPSHOT_POLL_SECONDS = 1.0
+SNAPSHOT_MAX_POP = 500
 
-def listen_and_process_snapshot_queue() -> None:
+
+class SnapshotWindow:
+    """
+    Decides when a batch of queued orders becomes a snapshot. `count` windows
+    close after SNAPSHOT_BATCH_SIZE orders or SNAPSHOT_MAX_WAIT_SECONDS after
+    their first order, the `minute` and `hour` windows close on the
+    wall-clock boundary.
+    """
+
+    def __init__(self, mode: str, batch_size: int, max_wait_seconds: int):
+        if mode != "count" and mode not in SNAPSHOT_WINDOW_SECONDS:
+            raise ValueError(f"Unknown snapshot window: {mode}")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+
+    @property
+    def interval(self) -> str:
+        if self.mode == "count":
+            return f"batch-{self.batch_size}"
+        return self.mode
+
+    def room(self, orders: List[Any]) -> int:
+        """how many orders to pop at most in one round trip"""
+        if self.mode == "count":
+            return self.batch_size - len(orders)
+        return SNAPSHOT_MAX_POP
+
+    def bounds(self, now: float) -> Tuple[float, float]:
+        if self.mode == "count":
+            return now, now + self.max_wait_seconds
+        length = SNAPSHOT_WINDOW_SECONDS[self.mode]
+        start = now - now % length
+        return start, start + length
+
+    def is_full(self, orders: List[Any]) -> bool:
+        return self.mode == "count" and len(orders) >= self.batch_size
+
+
+def pop_orders(redis, name: str, max_items: int, timeout: float) -> List[Any]:
+    """block for the first order, then take whatever else is queued in one call"""
+    raw = []
+    if timeout > 0:
+        first = redis.blpop([name], timeout=timeout)
+        if not first:
+            return []
+        raw.append(first[1])
+    if max_items > len(raw):
+        raw.extend(redis.lpop(name, max_items - len(raw)) or [])
+    return [json.loads(order_json) for order_json in raw]
+
+
+def listen_and_process_snapshot_queue(stop_event) -> None:
     redis = get_redis()
-    while True:
-        queue_length = redis.llen(settings.REDIS_QUEUE_ORDER)
-        print("queue length: ", queue_length)
-        if queue_length >= 10:
+    window = SnapshotWindow(
+        settings.SNAPSHOT_WINDOW,
+        settings.SNAPSHOT_BATCH_SIZE,
+        settings.SNAPSHOT_MAX_WAIT_SECONDS,
+    )
+    orders = []
+    window_start, window_end = window.bounds(time.time())
+
+    while not stop_event.is_set():
+        timeout = min(max(window_end - time.time(), 0), SNAPSHOT_POLL_SECONDS)
+        try:
+            popped = pop_orders(
+                redis, settings.REDIS_QUEUE_ORDER, window.room(orders), timeout
+            )
+        except Exception as e:
+            logger.warning("Unable to read snapshot queue: %s", e)
+            time.sleep(SNAPSHOT_POLL_SECONDS)
+            continue
+
+        now = time.time()
+        if now >= window_end:
+            flush_snapshot_window(orders, window, window_start)
+            orders = []
+            window_start, window_end = window.bounds(now)
+
+        if popped and not orders and window.mode == "count":
+            # the wait counts from the first order, not from the last flush
+            window_start, window_end = window.bounds(now)
+        orders.extend(popped)
+        if window.is_full(orders):
+            flush_snapshot_window(orders, window, window_start)
             orders = []
-            for _ in range(10):
-                order_json = redis.lpop(settings.REDIS_QUEUE_ORDER)
-                if order_json:
-                    orders.append(json.loads(order_json))
-            process_orders(orders)
-        else:
-            time.sleep(5)
+            window_start, window_end = window.bounds(time.time())
+
+    flush_snapshot_window(orders, window, window_start)
+
 
+def flush_snapshot_window(
+    orders: List[Any], window: SnapshotWindow, window_start: float
+) -> None:
+    if not orders:
+        return
+    snapshot_date = None
+    if window.mode != "count":
+        snapshot_date = datetime.fromtimestamp(window_start, tz=timezone.utc)
+    started = time.perf_counter()
+    process_orders(orders, interval=window.interval, snapshot_date=snapshot_date)
+    SNAPSHOT_FLUSH_SECONDS.labels(interval=window.interval).observe(
+        time.perf_counter() - started
+    )
 
-def process_orders(orders: Any) -> None:
-    print(f"Processing batch of 10 orders: {orders}")
+
+def process_orders(
+    orders: Any, interval: str, snapshot_date: Optional[datetime] = None
+) -> None:
+    logger.info(
+        "Processing snapshot", extra={"orders": len(orders), "interval": interval}
+    )
     total_sales = len(orders)
     total_revenue = 0.0
     total_tax = 0.0
@@ -147,14 +301,16 @@ def process_orders(orders: Any) -> None:
             total_tax=total_tax,
             total_shipping=total_shipping,
             total_discount=total_discount,
-            interval="batch-10",
+            interval=interval,
         )
+        if snapshot_date is not None:
+            snapshot.snapshot_date = snapshot_date
         db.add(snapshot)
         db.commit()
-        print("Sales snapshot saved to DB.")
-    except Exception as e:
+        logger.debug("Sales snapshot saved", extra={"interval": interval})
+    except Exception:
         db.rollback()
-        print(f"Failed to save sales snapshot: {e}")
+        logger.exception("Failed to save sales snapshot")
     finally:
         db.close()
 
@@ -1,103 +1,127 @@
-from kafka import KafkaAdminClient, KafkaProducer
-from kafka.admin import NewTopic
-import json
-import datetime
-import decimal
-import uuid
+from typing import Any, List, Optional, Tuple
+import asyncio
+import logging
 
 from app.core.config import settings
+from app.core.event_bus import get_event_bus
+from app.core.metrics import Counter, Gauge
 
+logger = logging.getLogger(__name__)
 
-def create_topics():
-    """create topics on kafka if not exist"""
-    try:
-        admin_client = KafkaAdminClient(
-            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS, client_id="admin-client"
-        )
-
-        existing_topics = admin_client.list_topics()
-
-        required_topics = [
-            settings.KAFKA_TOPIC_ORDER,
-            settings.KAFKA_TOPIC_SALES,
-        ]
-        topic_list = []
-        for topic_name in required_topics:
-            if topic_name and topic_name not in existing_topics:
-                print(f"Creating topic: {topic_name}")
-                topic_list.append(
-                    NewTopic(
-                        name=topic_name,
-                        num_partitions=1,
-                        replication_factor=1,
-                    )
-                )
-            else:
-                if topic_name:
-                    print(f"Topic {topic_name} already exists")
-
-        if topic_list:
-            admin_client.create_topics(new_topics=topic_list, validate_only=False)
-            print("Topics created successfully")
-
-        admin_client.close()
-
-    except Exception as e:
-        print(f"Error creating Kafka topics: {e}")
-
-
-create_topics()
-
-producer = KafkaProducer(
-    bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-    value_serializer=lambda v: json.dumps(v, default=default_serializer).encode(
-        "utf-8"
-    ),
-    connections_max_idle_ms=10000,
-    request_timeout_ms=30000,
-    metadata_max_age_ms=10000,
-    retry_backoff_ms=1000,
+
+EVENTS_SENT = Counter(
+    "kafka_producer_events_sent_total",
+    "Events acknowledged by the event bus",
+    ("topic",),
+)
+EVENTS_FAILED = Counter(
+    "kafka_producer_events_failed_total",
+    "Events that failed to be delivered to the event bus",
+    ("topic",),
+)
+PUBLISH_QUEUE_DEPTH = Gauge(
+    "kafka_producer_queue_depth",
+    "Events buffered on the event loop waiting for the event bus",
 )
 
 
-def default_serializer(obj):
-    if isinstance(obj, (datetime.datetime, datetime.date)):
-        return obj.isoformat()
-    if isinstance(obj, uuid.UUID):
-        return str(obj)
-    if isinstance(obj, decimal.Decimal):
-        return float(obj)
-    raise TypeError(f"Type {type(obj)} not serializable")
+def on_delivery(topic: str, error: Optional[Exception]) -> None:
+    if error is None:
+        EVENTS_SENT.labels(topic=topic).inc()
+        return
+    EVENTS_FAILED.labels(topic=topic).inc()
+    logger.warning("Failed to send message to %s: %s", topic, error)
+
+
+class EventPublisher:
+    """
+    Buffers events on the event loop and hands them to the event bus in
+    batches from a worker thread, so request handlers never wait on the broker.
+    """
+
+    def __init__(self, max_queue_size: int, drain_batch_size: int):
+        self.max_queue_size = max_queue_size
+        self.drain_batch_size = drain_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._drain())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Dropping %d unpublished events on shutdown", self._queue.qsize()
+            )
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._queue = None
+        bus = get_event_bus()
+        await asyncio.to_thread(bus.flush, timeout)
+        bus.close()
+
+    async def publish(self, topic: str, event_data: Any) -> None:
+        """queue an event, waiting for room when the buffer is full"""
+        if self._queue is None:
+            await asyncio.to_thread(self._send_batch, [(topic, event_data)])
+            return
+        await self._queue.put((topic, event_data))
+        PUBLISH_QUEUE_DEPTH.set(self._queue.qsize())
+
+    async def publish_many(self, events: List[Tuple[str, Any]]) -> None:
+        """queue a batch of (topic, event) pairs in order"""
+        if self._queue is None:
+            await asyncio.to_thread(self._send_batch, events)
+            return
+        for topic, event_data in events:
+            await self._queue.put((topic, event_data))
+        PUBLISH_QUEUE_DEPTH.set(self._queue.qsize())
+
+    async def _drain(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.drain_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            PUBLISH_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                await asyncio.to_thread(self._send_batch, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _send_batch(batch: List[Tuple[str, Any]]) -> None:
+        bus = get_event_bus()
+        for topic, event_data in batch:
+            try:
+                bus.publish(topic, event_data, on_delivery)
+            except Exception as e:
+                EVENTS_FAILED.labels(topic=topic).inc()
+                logger.warning("Event bus connection/send failed: %s", e)
+
+
+publisher = EventPublisher(
+    max_queue_size=settings.KAFKA_PRODUCER_QUEUE_SIZE,
+    drain_batch_size=settings.KAFKA_PRODUCER_DRAIN_BATCH,
+)
 
 
-def on_success(record_metadata):
-    print(
-        f"Message sent to topic {record_metadata.topic} partition {record_metadata.partition} offset {record_metadata.offset}"
-    )
+async def send_order_event(event_data) -> None:
+    await publisher.publish(settings.KAFKA_TOPIC_ORDER, event_data)
 
 
-def on_error(excp):
-    print(f"Failed to send message: {excp}")
+async def send_sales_event(event_data) -> None:
+    await publisher.publish(settings.KAFKA_TOPIC_SALES, event_data)
 
 
-async def send_order_event(event_data) -> None:
-    serialized_data = json.loads(json.dumps(event_data, default=default_serializer))
-
-    try:
-        future = producer.send(settings.KAFKA_TOPIC_ORDER, serialized_data)
-        future.add_callback(on_success)
-        future.add_errback(on_error)
-        producer.flush()
-    except Exception as e:
-        print(f"Kafka connection/send failed: {e}")
-
-
-def send_sales_event(event_data) -> None:
-    serialized_data = json.loads(json.dumps(event_data, default=default_serializer))
-    try:
-        future = producer.send(settings.KAFKA_TOPIC_SALES, serialized_data)
-        future.add_callback(on_success)
-        future.add_errback(on_error)
-        producer.flush()
-    except Exception as e:
-        print(f"Kafka connection/send failed: {e}")
\ No newline at end of file
+async def send_order_batch(order_events: List[Any], sales_events: List[Any]) -> None:
+    await publisher.publish_many(
+        [(settings.KAFKA_TOPIC_ORDER, event) for event in order_events]
+        + [(settings.KAFKA_TOPIC_SALES, event) for event in sales_events]
+    )
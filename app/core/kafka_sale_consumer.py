@@ -1,51 +1,223 @@
-from typing import Any
-from datetime import datetime
-from kafka import KafkaConsumer
-import json
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import OperationalError
+import logging
+import time
 import uuid
 
+from app.core.analytics_cache import bump_data_version
 from app.core.config import settings
+from app.core.consumer_metrics import ConsumerMonitor
+from app.core.event_bus import EventConsumer, get_event_bus
+from app.core.metrics import Counter
 from app.db.session import SessionLocal
 from app.models.sales import Sales
+from app.models.sales_dead_letter import SalesDeadLetter
 
-consumer = KafkaConsumer(
-    settings.KAFKA_TOPIC_SALES,
-    bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-    value_deserializer=lambda m: json.loads(m.decode("utf-8")),
-    auto_offset_reset="earliest",
-    enable_auto_commit=True,
-    group_id=settings.KAFKA_GROUP_ID,
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 1
+
+SALES_DEAD_LETTERS = Counter(
+    "sales_dead_letters_total",
+    "Sales events moved to sales_dead_letter after failing to insert",
+)
+
+# fold freshly inserted sales rows into every rollup grain in one statement
+SALES_ROLLUP_UPSERT = text(
+    """
+    INSERT INTO sales_rollup (
+        grain, period_start, product_id, category_id, channel_id,
+        total_revenue, total_sales
+    )
+    SELECT g.grain,
+        date_trunc(g.grain, s.sale_date)::date,
+        s.product_id,
+        s.category_id,
+        s.channel_id,
+        SUM(s.amount),
+        SUM(s.quantity)
+    FROM sales s
+    CROSS JOIN (VALUES ('day'), ('week'), ('month'), ('year')) AS g(grain)
+    WHERE s.id = ANY(CAST(:ids AS uuid[]))
+    GROUP BY 1, 2, 3, 4, 5
+    ON CONFLICT ON CONSTRAINT uq_sales_rollup_key DO UPDATE SET
+        total_revenue = sales_rollup.total_revenue + EXCLUDED.total_revenue,
+        total_sales = sales_rollup.total_sales + EXCLUDED.total_sales,
+        updated_at = now()
+    """
 )
 
 
 def consume_sale_events(stop_event):
+    """
+    Buffer sales events until SALES_CONSUMER_BATCH_SIZE records arrived or
+    SALES_CONSUMER_FLUSH_INTERVAL_MS elapsed, insert them in one transaction and
+    only then commit the consumer offsets.
+    """
+    batch_size = settings.SALES_CONSUMER_BATCH_SIZE
+    consumer = get_event_bus().consumer(
+        settings.KAFKA_TOPIC_SALES,
+        settings.KAFKA_GROUP_ID,
+        auto_commit=False,
+        max_poll_records=batch_size,
+    )
+    monitor = ConsumerMonitor("sales", consumer)
+    flush_interval = settings.SALES_CONSUMER_FLUSH_INTERVAL_MS / 1000
+    buffer = []
+    deadline = time.monotonic() + flush_interval
+
     while not stop_event.is_set():
-        for message in consumer:
-            data = message.value
-            print(data)
-            print("incoming sales data")
-            add_sales_record(data)
-        if stop_event.is_set():
+        timeout_ms = max(int((deadline - time.monotonic()) * 1000), 0)
+        records = consumer.poll(
+            timeout_ms=timeout_ms, max_records=batch_size - len(buffer)
+        )
+        monitor.polled(records)
+        for messages in records.values():
+            buffer.extend(messages)
+
+        if len(buffer) >= batch_size or time.monotonic() >= deadline:
+            if buffer:
+                flush_sales_batch(consumer, monitor, buffer)
+                buffer = []
+            deadline = time.monotonic() + flush_interval
+
+    if buffer:
+        flush_sales_batch(consumer, monitor, buffer)
+    consumer.close()
+
+
+def flush_sales_batch(
+    consumer: EventConsumer, monitor: ConsumerMonitor, messages: List[Any]
+) -> None:
+    """
+    Insert the batch, retrying up to SALES_CONSUMER_MAX_ATTEMPTS times. A
+    batch that keeps failing is split until the rows that fail on their own
+    are found, those go to `sales_dead_letter` so one bad event cannot block
+    the topic. Offsets are committed once every row is stored somewhere.
+    """
+    started = time.perf_counter()
+    rows = [row for row in (build_sales_row(m.value) for m in messages) if row]
+
+    for attempt in range(settings.SALES_CONSUMER_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(RETRY_BACKOFF_SECONDS)
+        if add_sales_records(rows):
             break
+    else:
+        try:
+            failed = isolate_failed_rows(rows)
+        except OperationalError:
+            failed = None
+        if failed is None or not add_dead_letters(failed):
+            # the database is unreachable rather than refusing rows, replay
+            # the batch on the next poll; rows the split already inserted are
+            # skipped as duplicates then
+            consumer.rewind(messages)
+            time.sleep(RETRY_BACKOFF_SECONDS)
+            return
+
+    consumer.commit()
+    monitor.processed_batch(messages, time.perf_counter() - started)
+
+
+def build_sales_row(data: Any) -> Optional[Dict[str, Any]]:
+    try:
+        return {
+            "id": str(uuid.uuid4()),
+            "order_id": data["order_id"],
+            "order_item_id": data["order_item_id"],
+            "product_id": data["product_id"],
+            "category_id": data["category_id"],
+            "channel_id": data["channel_id"],
+            "sale_date": data["sale_date"],
+            "quantity": data.get("quantity", 1),
+            "amount": data["amount"],
+        }
+    except (KeyError, TypeError) as e:
+        logger.warning("Skipping malformed sales event: %s", e)
+        return None
+
+
+def add_sales_records(rows: List[Dict[str, Any]]) -> bool:
+    try:
+        insert_sales_records(rows)
+        return True
+    except Exception:
+        logger.exception("Failed to create sales records")
+        return False
 
 
-def add_sales_record(data: Any) -> None:
+def insert_sales_records(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+
     db = SessionLocal()
     try:
-        sale = Sales(
-            order_id=data["order_id"],
-            order_item_id=data["order_item_id"],
-            product_id=data["product_id"],
-            category_id=data["category_id"],
-            channel_id=data["channel_id"],
-            sale_date=data["sale_date"],
-            amount=data["amount"],
-        )
-        db.add(sale)
+        # a redelivered event hits uq_sales_order_item and is skipped, only
+        # rows inserted now are added to the rollups
+        inserted = db.scalars(
+            pg_insert(Sales)
+            .on_conflict_do_nothing(index_elements=[Sales.order_item_id])
+            .returning(Sales.id),
+            rows,
+        ).all()
+        if inserted:
+            db.execute(
+                SALES_ROLLUP_UPSERT, {"ids": [str(sale_id) for sale_id in inserted]}
+            )
         db.commit()
-        print("try")
+        bump_data_version()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def isolate_failed_rows(rows: List[Dict[str, Any]]) -> List[Tuple[dict, str]]:
+    """
+    Insert what can be inserted by halving the rows, (row, error) for the
+    rest. Connection errors are raised, they say nothing about the rows.
+    """
+    try:
+        insert_sales_records(rows)
+        return []
+    except OperationalError:
+        raise
     except Exception as e:
+        if len(rows) == 1:
+            return [(rows[0], str(e))]
+    middle = len(rows) // 2
+    return isolate_failed_rows(rows[:middle]) + isolate_failed_rows(rows[middle:])
+
+
+def add_dead_letters(failed: List[Tuple[dict, str]]) -> bool:
+    if not failed:
+        return True
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            insert(SalesDeadLetter),
+            [
+                {"id": uuid.uuid4(), "payload": row, "error": error}
+                for row, error in failed
+            ],
+        )
+        db.commit()
+    except Exception:
         db.rollback()
-        print(f"Failed to create sales record: {e}")
+        logger.exception("Failed to store sales dead letters")
+        return False
     finally:
         db.close()
+
+    SALES_DEAD_LETTERS.inc(len(failed))
+    for row, error in failed:
+        logger.error(
+            "Sales event moved to dead letter table",
+            extra={"order_item_id": row.get("order_item_id"), "error": error},
+        )
+    return True
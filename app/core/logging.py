@@ -0,0 +1,134 @@
+import atexit
+import itertools
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+
+# extra={"sampled": True} marks a per-event message, only one in
+# LOG_SAMPLE_EVERY of them per logger and message is written
+SAMPLED = {"sampled": True}
+
+# attributes every LogRecord has, anything else came in through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "sampled"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """one json object per line, `extra` fields included as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        elif record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """lets one in `every` sampled records through per logger and message"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(every, 1)
+        self._calls: Dict[tuple, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or not getattr(record, "sampled", False):
+            return True
+        key = (record.name, record.msg)
+        calls = self._calls.get(key)
+        if calls is None:
+            calls = self._calls.setdefault(key, itertools.count())
+        # next() on itertools.count is atomic under the GIL, no lock needed
+        return next(calls) % self.every == 0
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread and never waits: when the queue is
+    full the record is dropped and counted. Only the message is rendered on
+    the calling thread, json formatting and the write happen on the listener.
+    """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # the queue may be full at shutdown, wait for room instead of failing
+        self.queue.put(self._sentinel)
+
+
+def parse_levels(levels: str) -> Dict[str, str]:
+    """`app.core.jwt=WARNING,app.core.kafka_order_consumer=DEBUG` to a dict"""
+    parsed = {}
+    for pair in levels.split(","):
+        name, _, level = pair.partition("=")
+        if name.strip() and level.strip():
+            parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+def setup_logging() -> None:
+    """route every log record through a bounded queue to a stdout json writer"""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_EVERY))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = DrainingQueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """write out whatever is still queued"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,273 @@
+import bisect
+import logging
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Metric(ABC):
+    """Base class for a named metric with optional labels"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def labels(self, **labels) -> "_Metric":
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """value holder for one label combination"""
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        if not self.labelnames:
+            return [((), self)]
+        with self._lock:
+            return list(self._children.items())
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._value = _CounterValue()
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value.inc(amount)
+
+    @property
+    def value(self) -> float:
+        return self._value.value
+
+
+class _GaugeValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._value = _GaugeValue()
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        self._value.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._value.dec(amount)
+
+    @property
+    def value(self) -> float:
+        return self._value.value
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.buckets):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs, +Inf last"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        running = 0
+        pairs = []
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            pairs.append((bound, running))
+        pairs.append((float("inf"), total))
+        return pairs
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed upper-bound buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, description, labelnames)
+        self._value = _HistogramValue(self.buckets)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._value.observe(value)
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        return self._value.cumulative()
+
+    @property
+    def sum(self) -> float:
+        return self._value.sum
+
+    @property
+    def count(self) -> int:
+        return self._value.count
+
+
+class Registry:
+    """
+    Process wide collection of metrics. Collectors are called right before
+    rendering, for values that are cheaper to read once per scrape than to
+    keep current on every change, like queue lengths.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def collect(self) -> None:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", collector.__name__, e)
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def metrics(self) -> List[_Metric]:
+        return list(self._metrics.values())
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+
+REGISTRY = Registry()
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def render(registry: Registry = REGISTRY) -> str:
+    """every metric of `registry` in the prometheus text exposition format"""
+    registry.collect()
+    lines = []
+    for metric in registry.metrics():
+        description = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for label_values, child in metric.children():
+            if metric.kind != "histogram":
+                labels = _format_labels(metric.labelnames, label_values)
+                lines.append(f"{metric.name}{labels} {_format_value(child.value)}")
+                continue
+            for bound, count in child.cumulative():
+                labels = _format_labels(
+                    (*metric.labelnames, "le"), (*label_values, _format_value(bound))
+                )
+                lines.append(f"{metric.name}_bucket{labels} {count}")
+            labels = _format_labels(metric.labelnames, label_values)
+            lines.append(f"{metric.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{metric.name}_count{labels} {child.count}")
+    return "\n".join(lines) + "\n"
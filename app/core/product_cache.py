@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+from typing import Any, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.broadcast import broadcaster
+from app.core.config import settings
+from app.core.lru_cache import TTLCache
+from app.core.metrics import Counter
+from app.db.redis import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "product:detail:version"
+# stored for SKUs that do not exist, so repeated misses never reach postgres
+MISSING = "__missing__"
+# invalidation message that drops every cached product
+ALL_PRODUCTS = "*"
+
+PRODUCT_CACHE_LOOKUPS = Counter(
+    "product_cache_lookups_total",
+    "Product detail lookups by the tier that answered them",
+    ("tier",),
+)
+
+# KEYS: sku version key, detail key
+# ARGV: sku version read before loading the detail, detail, ttl
+# writes the detail only if no worker invalidated the sku since
+CACHE_PRODUCT_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# registering only hashes the source, nothing is sent to redis here
+cache_product_script = get_async_redis().register_script(CACHE_PRODUCT_SCRIPT)
+
+# sku -> serialized product detail, or MISSING
+local_cache = TTLCache(maxsize=settings.PRODUCT_CACHE_LOCAL_SIZE)
+
+# bumped on every invalidation seen by this worker, a lookup that started
+# before an invalidation must not write its answer back
+_generation = 0
+# redis key version, None until read; bumped when categories change because
+# every cached detail embeds its category
+_version: Optional[int] = None
+
+
+def redis_key(version: int, sku: str) -> str:
+    return f"product:detail:{version}:{sku}"
+
+
+def sku_version_key(sku: str) -> str:
+    return f"product:version:{sku}"
+
+
+async def start_lookup(sku: str) -> Tuple[int, Optional[bytes]]:
+    """
+    Read before loading a detail from postgres and hand to `cache_product`:
+    the local generation, and the redis version of `sku` that every worker
+    bumps when it invalidates it (None when redis could not be read).
+    """
+    try:
+        version = await get_async_redis().get(sku_version_key(sku))
+    except RedisError:
+        return _generation, None
+    return _generation, version or b"0"
+
+
+async def _current_version(redis) -> int:
+    global _version
+    if _version is None:
+        _version = int(await redis.get(VERSION_KEY) or 0)
+    return _version
+
+
+async def get_cached_product(sku: str) -> Optional[Any]:
+    """serialized detail, MISSING for unknown SKUs, or None when not cached"""
+    cached = local_cache.get(sku)
+    if cached is not None:
+        PRODUCT_CACHE_LOOKUPS.labels(tier="local").inc()
+        return cached
+
+    redis = get_async_redis()
+    try:
+        raw = await redis.get(redis_key(await _current_version(redis), sku))
+    except RedisError:
+        raw = None
+    if raw is None:
+        PRODUCT_CACHE_LOOKUPS.labels(tier="database").inc()
+        return None
+
+    PRODUCT_CACHE_LOOKUPS.labels(tier="redis").inc()
+    cached = json.loads(raw)
+    ttl = settings.PRODUCT_CACHE_LOCAL_TTL_SECONDS
+    local_cache.set(sku, cached, ttl)
+    return cached
+
+
+async def cache_product(
+    sku: str, detail: Any, started_at: Tuple[int, Optional[bytes]]
+) -> None:
+    """
+    Store `detail` (or MISSING) in both tiers unless an invalidation arrived
+    since `started_at`, what `start_lookup` returned before loading it. The
+    redis version is compared in the same script that writes, so an
+    invalidation by another worker is caught even before its message is.
+    """
+    generation, version = started_at
+    if generation != _generation:
+        return
+    if detail == MISSING:
+        ttl = settings.PRODUCT_CACHE_MISSING_TTL_SECONDS
+    else:
+        ttl = settings.PRODUCT_CACHE_TTL_SECONDS
+
+    if version is not None:
+        redis = get_async_redis()
+        try:
+            key = redis_key(await _current_version(redis), sku)
+            stored = await cache_product_script(
+                keys=[sku_version_key(sku), key],
+                args=[version, json.dumps(detail), ttl],
+            )
+        except RedisError as e:
+            logger.warning("Unable to cache product %s: %s", sku, e)
+        else:
+            if not stored:
+                return
+    # the generation is checked again, the message may have come meanwhile
+    if generation == _generation:
+        local_cache.set(
+            sku, detail, min(ttl, settings.PRODUCT_CACHE_LOCAL_TTL_SECONDS)
+        )
+
+
+def _forget(message: str) -> None:
+    global _generation, _version
+    _generation += 1
+    if message == ALL_PRODUCTS:
+        _version = None
+        local_cache.clear()
+    else:
+        local_cache.delete(message)
+
+
+async def invalidate_products(*skus: str) -> None:
+    """drop the cached detail of `skus` in redis and in every worker"""
+    skus = tuple(sku for sku in skus if sku)
+    if not skus:
+        return
+    for sku in skus:
+        _forget(sku)
+    redis = get_async_redis()
+    try:
+        # bumped before the delete, a lookup that loaded the old detail
+        # then fails its version check instead of writing it back
+        pipe = redis.pipeline(transaction=False)
+        for sku in skus:
+            pipe.incr(sku_version_key(sku))
+        await pipe.execute()
+        version = await _current_version(redis)
+        await redis.delete(*(redis_key(version, sku) for sku in skus))
+        for sku in skus:
+            await redis.publish(settings.REDIS_PRODUCT_INVALIDATION, sku)
+    except RedisError as e:
+        logger.warning("Unable to invalidate cached products: %s", e)
+
+
+def invalidate_all_products() -> None:
+    """
+    Drop every cached detail, used when categories change. Moving to a new
+    key version is a single write, old keys simply expire.
+    """
+    redis = get_redis()
+    try:
+        redis.incr(VERSION_KEY)
+        redis.publish(settings.REDIS_PRODUCT_INVALIDATION, ALL_PRODUCTS)
+    except RedisError as e:
+        logger.warning("Unable to invalidate cached products: %s", e)
+    # after the bump, so the version is re-read as the new one
+    _forget(ALL_PRODUCTS)
+
+
+async def listen_for_product_invalidation() -> None:
+    subscription = await broadcaster.subscribe_with_retry(
+        settings.REDIS_PRODUCT_INVALIDATION
+    )
+    try:
+        while True:
+            message = await subscription.get(timeout=60)
+            if message:
+                _forget(message)
+    except asyncio.CancelledError:
+        broadcaster.unsubscribe(subscription)
+        raise
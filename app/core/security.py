@@ -1,8 +1,25 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
 import bcrypt
 from fastapi import HTTPException
 from redis import Redis
 
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+
+PASSWORD_HASH_IN_FLIGHT = Gauge(
+    "password_hash_in_flight",
+    "bcrypt hash/verify calls queued or running in the password executor",
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "bcrypt calls rejected because the password executor queue was full",
+)
+
+_password_executor: Optional[Executor] = None
+_password_in_flight = 0
 
 
 def get_password_hash(password: str) -> str:
@@ -18,6 +35,64 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     )
 
 
+def get_password_executor() -> Executor:
+    """
+    Dedicated pool for bcrypt so hashing never runs on the event loop.
+    bcrypt releases the GIL, threads already use several cores; the process
+    pool is there for deployments that want hashing fully isolated.
+    """
+    global _password_executor
+    if _password_executor is None:
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            _password_executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS
+            )
+        else:
+            _password_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash",
+            )
+    return _password_executor
+
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+
+async def _run_in_password_executor(fn, *args):
+    global _password_in_flight
+    if _password_in_flight >= settings.PASSWORD_HASH_MAX_QUEUE:
+        PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Too many authentication requests at the moment, please retry",
+        )
+
+    _password_in_flight += 1
+    PASSWORD_HASH_IN_FLIGHT.set(_password_in_flight)
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_executor(), fn, *args)
+    finally:
+        _password_in_flight -= 1
+        PASSWORD_HASH_IN_FLIGHT.set(_password_in_flight)
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password in the password executor"""
+    return await _run_in_password_executor(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the password executor"""
+    return await _run_in_password_executor(
+        verify_password, plain_password, hashed_password
+    )
+
+
 def rate_limiting(ip: str, module: str, redis_client: Redis) -> None:
     key = f"{module}:rate:{ip}"
     attempts = redis_client.get(key)
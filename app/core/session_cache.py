@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.core.broadcast import broadcaster
+from app.core.config import settings
+from app.core.lru_cache import TTLCache
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+SESSION_CACHE_HITS = Counter(
+    "session_cache_hits_total", "Authenticated requests served from the session cache"
+)
+SESSION_CACHE_MISSES = Counter(
+    "session_cache_misses_total", "Authenticated requests that verified the token"
+)
+
+# token -> verified jwt payload
+session_cache = TTLCache(maxsize=settings.SESSION_CACHE_SIZE)
+
+# user id -> number of invalidations so far, a lookup that started before an
+# invalidation must not cache the token it verified. Only lookups in flight
+# need it, so entries expire and the least recently invalidated users go
+# first once SESSION_CACHE_SIZE users were invalidated within the TTL
+_generations = TTLCache(maxsize=settings.SESSION_CACHE_SIZE)
+_generations_lock = threading.Lock()
+
+
+def get_cached_session(token: str) -> Optional[dict]:
+    payload = session_cache.get(token)
+    if payload is None:
+        SESSION_CACHE_MISSES.inc()
+    else:
+        SESSION_CACHE_HITS.inc()
+    return payload
+
+
+def session_generation(user_id: str) -> int:
+    """read before checking the session in redis, pass to `cache_session`"""
+    return _generations.get(user_id, 0)
+
+
+def cache_session(token: str, payload: dict, generation: int) -> None:
+    """
+    Remember a verified token, never past its `exp` claim. Skipped when the
+    sessions of the user were invalidated since `generation` was read.
+    """
+    ttl = settings.SESSION_CACHE_TTL_SECONDS
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    with _generations_lock:
+        if _generations.get(payload.get("sub"), 0) == generation:
+            session_cache.set(token, payload, ttl)
+
+
+def invalidate_user_sessions(user_id: str) -> None:
+    with _generations_lock:
+        _generations.set(
+            user_id,
+            _generations.get(user_id, 0) + 1,
+            settings.SESSION_CACHE_TTL_SECONDS,
+        )
+        session_cache.delete_where(lambda _, payload: payload.get("sub") == user_id)
+
+
+def rotate_user_session(redis_client: Redis, user_id: str) -> None:
+    """drop cached tokens of `user_id` in this worker and every other one"""
+    invalidate_user_sessions(user_id)
+    try:
+        redis_client.publish(settings.REDIS_SESSION_INVALIDATION, user_id)
+    except RedisError as e:
+        logger.warning("Unable to publish session invalidation: %s", e)
+
+
+async def listen_for_session_invalidation() -> None:
+    subscription = await broadcaster.subscribe_with_retry(
+        settings.REDIS_SESSION_INVALIDATION
+    )
+    try:
+        while True:
+            user_id = await subscription.get(timeout=60)
+            if user_id:
+                invalidate_user_sessions(user_id)
+    except asyncio.CancelledError:
+        broadcaster.unsubscribe(subscription)
+        raise
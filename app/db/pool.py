@@ -0,0 +1,67 @@
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.metrics import Counter, Gauge, Histogram
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection, including new connects",
+    ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+POOL_EXHAUSTED = Counter(
+    "db_pool_exhausted_total",
+    "Checkouts that gave up after pool_timeout with every connection in use",
+    ("pool",),
+)
+POOL_IN_USE = Gauge("db_pool_connections_in_use", "Checked out connections", ("pool",))
+POOL_IDLE = Gauge("db_pool_connections_idle", "Connections idle in the pool", ("pool",))
+
+
+def pool_name(pool: Pool) -> str:
+    # set through create_engine(pool_logging_name=...), survives pool.recreate()
+    return pool.logging_name or "default"
+
+
+def record_pool_usage(pool: Pool) -> None:
+    name = pool_name(pool)
+    POOL_IN_USE.labels(pool=name).set(pool.checkedout())
+    POOL_IDLE.labels(pool=name).set(pool.checkedin())
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every checkout and keeps the in-use/idle gauges current. Pool
+    events only fire once a connection has been handed out, so the wait for
+    a free slot is only visible around `_do_get`. Hooking the pool class
+    rather than a pool instance keeps working after `pool.recreate()`.
+    """
+
+    def _do_get(self):
+        name = pool_name(self)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            POOL_EXHAUSTED.labels(pool=name).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.labels(pool=name).observe(
+                time.perf_counter() - started
+            )
+        record_pool_usage(self)
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        record_pool_usage(self)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
@@ -1,10 +1,13 @@
 import redis
+import redis.asyncio as aioredis
 from app.core.config import settings
 
 redis_client = redis.from_url(settings.REDIS_URL)
 
 redis_client_sub = redis.from_url(settings.REDIS_URL)
 
+async_redis_client = aioredis.from_url(settings.REDIS_URL)
+
 
 def get_redis() -> redis.Redis:
     return redis_client
@@ -12,3 +15,7 @@ def get_redis() -> redis.Redis:
 
 def get_redis_sub() -> redis.Redis:
     return redis_client_sub
+
+
+def get_async_redis() -> aioredis.Redis:
+    return async_redis_client
@@ -1,12 +1,63 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import REGISTRY
+from app.db.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    record_pool_usage,
+)
 
-engine = create_engine(settings.DATABASE_URL)
+
+def pool_options(name: str) -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_logging_name": name,
+    }
+
+
+# shared by the sync endpoints (threadpool), the kafka consumers and the
+# snapshot thread; the async API handlers get a pool of their own below
+engine = create_engine(
+    settings.DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options("sync")
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def async_database_url(url: str) -> str:
+    """DATABASE_URL pointed at the asyncpg driver"""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(
+        hide_password=False
+    )
+
+
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    poolclass=InstrumentedAsyncQueuePool,
+    **pool_options("async"),
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+def collect_pool_usage() -> None:
+    # the gauges move on checkout and return, an idle pool may have been
+    # recreated or shrunk by recycling since
+    record_pool_usage(engine.pool)
+    record_pool_usage(async_engine.pool)
+
+
+REGISTRY.add_collector(collect_pool_usage)
+
+
 def get_db():
     """
     Dependency function that will ensures db closed after use.
@@ -16,3 +67,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Async counterpart of `get_db` for the API handlers, the kafka consumer
+    threads keep using `SessionLocal`.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
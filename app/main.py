@@ -1,12 +1,27 @@
+from app.core.logging import setup_logging, shutdown_logging
+
+# before the app modules below, some of them log while being imported
+setup_logging()
+
 from fastapi import FastAPI, Request
 from contextlib import asynccontextmanager
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.exc import IntegrityError
 from app.core.kafka_order_consumer import (
     consume_order_events,
     listen_and_process_snapshot_queue,
 )
 from app.core.kafka_sale_consumer import consume_sale_events
+from app.core.flash_inventory import reconcile_flash_reservations
+from app.core.kafka_producer import publisher
+from app.core.broadcast import broadcaster
+from app.core.session_cache import listen_for_session_invalidation
+from app.core.category_tree import listen_for_category_invalidation
+from app.core.product_cache import listen_for_product_invalidation
+from app.core.security import shutdown_password_executor
+from app.core.http_metrics import MetricsMiddleware
+from app.core.metrics import CONTENT_TYPE, render
+from app.db.session import async_engine
 
 from app.core.config import settings
 from app.api.endpoints import (
@@ -17,17 +32,22 @@ from app.api.endpoints import (
     sales_channel,
     orders,
     alerts,
-    sales
+    sales,
+    health,
 )
+import logging
+import asyncio
 import threading
 
+logger = logging.getLogger(__name__)
+
 stop_event = threading.Event()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("lifespan")
     """Lifespan context manager for the FastAPI app"""
+    logger.info("Starting background workers")
     consumer_thread = threading.Thread(target=consume_order_events, args=(stop_event,))
     consumer_thread.daemon = True
     consumer_thread.start()
@@ -38,16 +58,42 @@ async def lifespan(app: FastAPI):
     consumer_sales_thread.daemon = True
     consumer_sales_thread.start()
 
-    snapshot_queue_thread = threading.Thread(target=listen_and_process_snapshot_queue)
+    snapshot_queue_thread = threading.Thread(
+        target=listen_and_process_snapshot_queue, args=(stop_event,)
+    )
     snapshot_queue_thread.daemon = True
     snapshot_queue_thread.start()
 
+    flash_reconcile_thread = threading.Thread(
+        target=reconcile_flash_reservations, args=(stop_event,)
+    )
+    flash_reconcile_thread.daemon = True
+    flash_reconcile_thread.start()
+
+    await publisher.start()
+    session_invalidation_task = asyncio.create_task(listen_for_session_invalidation())
+    category_invalidation_task = asyncio.create_task(
+        listen_for_category_invalidation()
+    )
+    product_invalidation_task = asyncio.create_task(
+        listen_for_product_invalidation()
+    )
+
     yield
 
+    session_invalidation_task.cancel()
+    category_invalidation_task.cancel()
+    product_invalidation_task.cancel()
+    await publisher.stop()
+    await broadcaster.close()
+    shutdown_password_executor()
+    await async_engine.dispose()
     stop_event.set()
     consumer_thread.join()
     consumer_sales_thread.join()
     snapshot_queue_thread.join()
+    flash_reconcile_thread.join()
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -59,6 +105,7 @@ app = FastAPI(
     redoc_url="/redoc",
     lifespan=lifespan,
 )
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(users.router, prefix=settings.API_V1_STR)
@@ -69,6 +116,8 @@ app.include_router(sales_channel.router, prefix=settings.API_V1_STR)
 app.include_router(orders.router, prefix=settings.API_V1_STR)
 app.include_router(alerts.router, prefix=settings.API_V1_STR)
 app.include_router(sales.router, prefix=settings.API_V1_STR)
+# unversioned like /metrics, probes should not follow API versions
+app.include_router(health.router)
 
 
 @app.get("/")
@@ -76,6 +125,12 @@ async def root():
     return {"message": "Welcome to the forsit assignment"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # sync on purpose, the scrape time collectors make blocking redis calls
+    return PlainTextResponse(render(), media_type=CONTENT_TYPE)
+
+
 @app.exception_handler(IntegrityError)
 async def integerity_error_handler(request: Request, exc: IntegrityError):
     return JSONResponse(
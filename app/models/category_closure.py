@@ -0,0 +1,21 @@
+from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base_class import Base
+
+
+class CategoryClosure(Base):
+    """ancestor/descendant pairs of the category tree, kept by a db trigger"""
+
+    __tablename__ = "category_closure"
+
+    ancestor_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("category.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    descendant_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("category.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    depth = Column(Integer, nullable=False)
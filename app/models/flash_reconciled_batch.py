@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class FlashReconciledBatch(Base):
+    """flash reservation batches already applied to the inventory"""
+
+    __tablename__ = "flash_reconciled_batch"
+
+    batch_id = Column(UUID(as_uuid=True), primary_key=True)
+    applied_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Text, DECIMAL, ForeignKey, TIMESTAMP
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Computed, String, Text, DECIMAL, ForeignKey, TIMESTAMP
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 import uuid
 from app.db.base_class import Base
 
@@ -23,6 +23,17 @@ class Product(Base):
     updated_at = Column(
         TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('simple', coalesce(sku, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(name, '')), 'B') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+                persisted=True,
+            ),
+        )
+    )
 
     # rel
     creator = relationship("User", back_populates="products")
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, ForeignKey, Numeric, DateTime
+from sqlalchemy import Column, ForeignKey, Integer, Numeric, DateTime, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -7,6 +7,7 @@ from app.db.base_class import Base
 
 class Sales(Base):
     __tablename__ = "sales"
+    __table_args__ = (UniqueConstraint("order_item_id", name="uq_sales_order_item"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
@@ -15,6 +16,7 @@ class Sales(Base):
     category_id = Column(UUID(as_uuid=True), ForeignKey("category.id", ondelete="SET NULL"), nullable=True)
     channel_id = Column(UUID(as_uuid=True), ForeignKey("sales_channel.id", ondelete="SET NULL"), nullable=True)
     sale_date = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
-    amount = Column(Numeric(10, 4), nullable=False)
+    quantity = Column(Integer, nullable=False, default=1)
+    amount = Column(Numeric(14, 4), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
@@ -0,0 +1,16 @@
+import uuid
+from sqlalchemy import Column, DateTime, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class SalesDeadLetter(Base):
+    """sales events that failed to insert on their own, with the error"""
+
+    __tablename__ = "sales_dead_letter"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    payload = Column(JSONB, nullable=False)
+    error = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
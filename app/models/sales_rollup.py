@@ -0,0 +1,33 @@
+import uuid
+from sqlalchemy import Column, Date, ForeignKey, Integer, Numeric, DateTime, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+ROLLUP_GRAINS = ("day", "week", "month", "year")
+
+
+class SalesRollup(Base):
+    __tablename__ = "sales_rollup"
+    __table_args__ = (
+        UniqueConstraint(
+            "grain",
+            "period_start",
+            "product_id",
+            "category_id",
+            "channel_id",
+            name="uq_sales_rollup_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    grain = Column(String(10), nullable=False)
+    period_start = Column(Date, nullable=False)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("product.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(UUID(as_uuid=True), ForeignKey("category.id", ondelete="SET NULL"), nullable=True)
+    channel_id = Column(UUID(as_uuid=True), ForeignKey("sales_channel.id", ondelete="SET NULL"), nullable=True)
+    total_revenue = Column(Numeric(16, 4), nullable=False, default=0)
+    total_sales = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
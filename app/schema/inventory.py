@@ -1,6 +1,6 @@
 from typing import Optional, List
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 from app.schema.inventory_history import InventoryHistory
@@ -24,6 +24,11 @@ class InventoryUpdate(BaseModel):
     change_reason: str
 
 
+class FlashReplenish(BaseModel):
+    quantity: int = Field(..., gt=0)
+    change_reason: str
+
+
 class Inventory(InventoryBase):
     id: UUID
     created_at: datetime
@@ -45,3 +50,16 @@ class InventoryDetails(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class InventoryAlert(BaseModel):
+    id: UUID
+    product_id: UUID
+    quantity: int
+    last_restock_date: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    product: ProductSecondary
+
+    class Config:
+        from_attributes = True
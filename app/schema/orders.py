@@ -63,6 +63,18 @@ class OrderCreate(OrderBaseSecondary):
     items: List[OrderItemCreate]
 
 
+class OrderBulkCreate(BaseModel):
+    orders: List[OrderCreate]
+
+
+class OrderBulkResult(BaseModel):
+    index: int
+    status: str
+    order_id: Optional[UUID] = None
+    order_number: Optional[str] = None
+    detail: Optional[str] = None
+
+
 class OrderUpdate(BaseModel):
     order_number: Optional[str] = None
     channel_id: Optional[UUID] = None
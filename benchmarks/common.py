@@ -0,0 +1,43 @@
+import statistics
+import uuid
+from typing import List, Tuple
+
+import httpx
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> dict:
+    """latency summary in milliseconds"""
+    if not samples:
+        return {"requests": 0}
+    return {
+        "requests": len(samples),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+async def register_user(
+    client: httpx.AsyncClient, password: str = "Bench!Password1"
+) -> Tuple[str, str]:
+    """register a throwaway user, returns (email, access token)"""
+    suffix = uuid.uuid4().hex[:10]
+    email = f"bench_{suffix}@example.com"
+    response = await client.post(
+        "/api/v1/user/register",
+        json={
+            "email": email,
+            "username": f"bench_{suffix}",
+            "name": "Benchmark",
+            "password": password,
+        },
+    )
+    response.raise_for_status()
+    return email, response.json()["access_token"]
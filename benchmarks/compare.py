@@ -0,0 +1,98 @@
+"""
+Compare two result files of `benchmarks.run` endpoint by endpoint.
+
+Prints throughput and p50/p95/p99 of both runs with the relative change and
+flags an endpoint when its p95 or p99 grew, or its throughput dropped, by
+more than `--threshold` percent. Exits non-zero when anything regressed.
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from typing import Optional
+
+# metric -> True when a higher value is better
+METRICS = {
+    "requests_per_second": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+# p50 moves with every bit of noise, only these decide a regression
+GATING = ("requests_per_second", "p95_ms", "p99_ms")
+
+
+def change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(before: dict, after: dict, threshold: float) -> dict:
+    if before["meta"]["mix"] != after["meta"]["mix"]:
+        print(
+            f"warning: comparing mix {before['meta']['mix']} "
+            f"with mix {after['meta']['mix']}",
+            file=sys.stderr,
+        )
+    endpoints = {}
+    for name in sorted(set(before["endpoints"]) & set(after["endpoints"])):
+        old, new = before["endpoints"][name], after["endpoints"][name]
+        rows = {}
+        regressed = []
+        for metric, higher_is_better in METRICS.items():
+            delta = change(old.get(metric), new.get(metric))
+            rows[metric] = {
+                "before": old.get(metric),
+                "after": new.get(metric),
+                "change_pct": None if delta is None else round(delta, 1),
+            }
+            worse = -delta if higher_is_better and delta is not None else delta
+            if metric in GATING and worse is not None and worse > threshold:
+                regressed.append(metric)
+        endpoints[name] = {"metrics": rows, "regressed": regressed}
+    return endpoints
+
+
+def print_table(endpoints: dict) -> None:
+    header = f"{'endpoint':<24}" + "".join(f"{m:>26}" for m in METRICS)
+    print(header)
+    for name, result in endpoints.items():
+        cells = []
+        for metric in METRICS:
+            row = result["metrics"][metric]
+            delta = row["change_pct"]
+            delta_text = "n/a" if delta is None else f"{delta:+.1f}%"
+            cells.append(f"{row['before']} -> {row['after']} ({delta_text})")
+        flag = "  REGRESSED" if result["regressed"] else ""
+        print(f"{name:<24}" + "".join(f"{c:>26}" for c in cells) + flag)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    parser.add_argument("--json", action="store_true", help="print json instead")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    endpoints = compare(before, after, args.threshold)
+    if args.json:
+        print(json.dumps(endpoints, indent=2))
+    else:
+        print_table(endpoints)
+    if any(result["regressed"] for result in endpoints.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Throughput and latency of database backed read endpoints under concurrency.
+
+Fires `--requests` GETs at each level of `--concurrency` against a running
+server and reports requests/second and latency percentiles per level. Run it
+once against a single uvicorn worker on the sync session build and once on
+the async session build with the same `--label`led output files, then diff.
+
+    python -m benchmarks.db_concurrency --concurrency 1 8 32 64 --label async
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+import httpx
+
+from benchmarks.common import summarize
+
+DEFAULT_PATHS = [
+    "/api/v1/product/?limit=20&count=estimated",
+    "/api/v1/category/",
+    "/api/v1/sales-channels/",
+]
+
+
+async def fire(
+    client: httpx.AsyncClient, paths: List[str], remaining: list, timings: list
+) -> dict:
+    codes: dict = {}
+    while remaining:
+        path = paths[remaining.pop() % len(paths)]
+        started = time.perf_counter()
+        response = await client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        codes[response.status_code] = codes.get(response.status_code, 0) + 1
+    return codes
+
+
+async def run_level(
+    base_url: str, paths: List[str], requests: int, concurrency: int
+) -> dict:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=60, limits=limits
+    ) as client:
+        remaining = list(range(requests))
+        timings: list = []
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(fire(client, paths, remaining, timings) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+    codes: dict = {}
+    for worker_codes in results:
+        for code, total in worker_codes.items():
+            codes[code] = codes.get(code, 0) + total
+    return {
+        "concurrency": concurrency,
+        "requests_per_second": round(requests / elapsed, 2),
+        "status_codes": codes,
+        **summarize(timings),
+    }
+
+
+async def run(
+    base_url: str, paths: List[str], requests: int, levels: List[int]
+) -> List[dict]:
+    # warm the pools and caches before measuring
+    await run_level(base_url, paths, min(requests, 50), max(levels))
+    return [await run_level(base_url, paths, requests, level) for level in levels]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--paths", nargs="*", default=DEFAULT_PATHS)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 8, 32, 64])
+    parser.add_argument("--label", default="current")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    levels = asyncio.run(
+        run(args.base_url, args.paths, args.requests, args.concurrency)
+    )
+    result = {"label": args.label, "paths": args.paths, "levels": levels}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
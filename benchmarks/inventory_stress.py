@@ -0,0 +1,143 @@
+"""
+Hammer a single SKU with concurrent orders and check nothing was oversold.
+
+Resets the latest inventory row of `--sku` to `--stock`, then `--workers`
+clients place `--orders` single line orders of `--quantity` each as fast as
+they can. Afterwards the remaining stock must equal the starting stock minus
+everything that was accepted, and never drop below zero. Exits non-zero when
+an oversell is detected.
+
+    python -m benchmarks.inventory_stress --sku SKU-1 --stock 100 --orders 500
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.common import register_user, summarize
+
+
+async def first_channel_id(client: httpx.AsyncClient) -> str:
+    response = await client.get("/api/v1/sales-channels/")
+    response.raise_for_status()
+    channels = response.json()["data"]
+    if not channels:
+        raise SystemExit("No sales channel to place orders on")
+    return channels[0]["id"]
+
+
+async def inventory_of(client: httpx.AsyncClient, sku: str) -> dict:
+    response = await client.get(f"/api/v1/inventory/{sku}")
+    response.raise_for_status()
+    return response.json()["data"]
+
+
+async def order_worker(
+    client: httpx.AsyncClient,
+    payload: dict,
+    remaining: list,
+    codes: dict,
+    timings: list,
+) -> None:
+    while remaining:
+        remaining.pop()
+        started = time.perf_counter()
+        response = await client.post("/api/v1/orders/", json=payload)
+        timings.append((time.perf_counter() - started) * 1000)
+        codes[response.status_code] = codes.get(response.status_code, 0) + 1
+
+
+async def run(
+    base_url: str,
+    sku: str,
+    stock: int,
+    orders: int,
+    workers: int,
+    quantity: int,
+    channel_id: Optional[str],
+) -> dict:
+    limits = httpx.Limits(max_connections=workers + 1)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=60, limits=limits
+    ) as client:
+        _, token = await register_user(client)
+        client.headers["Authorization"] = f"Bearer {token}"
+        channel_id = channel_id or await first_channel_id(client)
+
+        inventory = await inventory_of(client, sku)
+        response = await client.patch(
+            f"/api/v1/inventory/{inventory['id']}",
+            json={"quantity": stock, "change_reason": "inventory stress test"},
+        )
+        response.raise_for_status()
+
+        payload = {
+            "channel_id": channel_id,
+            "status": "PENDING",
+            "items": [{"product_id": inventory["product_id"], "quantity": quantity}],
+        }
+        remaining = list(range(orders))
+        codes: dict = {}
+        timings: list = []
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                order_worker(client, payload, remaining, codes, timings)
+                for _ in range(workers)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+        final_stock = (await inventory_of(client, sku))["quantity"]
+
+    accepted = codes.get(200, 0)
+    sold = accepted * quantity
+    return {
+        "sku": sku,
+        "workers": workers,
+        "orders": orders,
+        "orders_per_second": round(orders / elapsed, 2),
+        "status_codes": codes,
+        "starting_stock": stock,
+        "sold": sold,
+        "final_stock": final_stock,
+        "oversold": max(0, sold - stock),
+        "consistent": final_stock == stock - sold and final_stock >= 0,
+        "latency": summarize(timings),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--sku", required=True)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--channel-id", default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run(
+            args.base_url,
+            args.sku,
+            args.stock,
+            args.orders,
+            args.workers,
+            args.quantity,
+            args.channel_id,
+        )
+    )
+    print(json.dumps(result, indent=2))
+    if result["oversold"] or not result["consistent"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
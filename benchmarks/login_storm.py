@@ -0,0 +1,109 @@
+"""
+Latency of an unrelated endpoint while the API is flooded with logins.
+
+Registers one throwaway user, then measures `--probe` latency twice: on an
+idle server and while `--concurrency` clients log in as fast as they can.
+With bcrypt on the event loop the storm p99 jumps to several hash durations;
+with the password executor it should stay close to the idle baseline.
+
+Login is rate limited per client ip, raise HTTP_MAX_ATTEMPTS on the server
+before running this.
+
+    python -m benchmarks.login_storm --base-url http://localhost:8000 --logins 400
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.common import register_user, summarize
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event) -> list:
+    timings = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+    return timings
+
+
+async def login_worker(
+    client: httpx.AsyncClient, email: str, password: str, remaining: list, codes: dict
+) -> None:
+    while remaining:
+        remaining.pop()
+        response = await client.post(
+            "/api/v1/user/login", json={"email": email, "password": password}
+        )
+        codes[response.status_code] = codes.get(response.status_code, 0) + 1
+
+
+async def run(
+    base_url: str, path: str, logins: int, concurrency: int, baseline: float
+) -> dict:
+    password = "Storm!Password1"
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=60, limits=limits
+    ) as client:
+        email, _ = await register_user(client, password)
+
+        stop = asyncio.Event()
+        idle = asyncio.create_task(probe(client, path, stop))
+        await asyncio.sleep(baseline)
+        stop.set()
+        idle_timings = await idle
+
+        stop = asyncio.Event()
+        storm = asyncio.create_task(probe(client, path, stop))
+        remaining = list(range(logins))
+        codes: dict = {}
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                login_worker(client, email, password, remaining, codes)
+                for _ in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        storm_timings = await storm
+
+    return {
+        "probe": path,
+        "logins": logins,
+        "concurrency": concurrency,
+        "logins_per_second": round(logins / elapsed, 2),
+        "login_status_codes": codes,
+        "idle": summarize(idle_timings),
+        "during_storm": summarize(storm_timings),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--probe", default="/")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--baseline-seconds", type=float, default=5)
+    args = parser.parse_args()
+    result = asyncio.run(
+        run(
+            args.base_url,
+            args.probe,
+            args.logins,
+            args.concurrency,
+            args.baseline_seconds,
+        )
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
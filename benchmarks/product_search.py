@@ -0,0 +1,75 @@
+"""
+Compare the indexed full-text product search with the legacy ilike search.
+
+Runs the same query the product list endpoint builds for each search mode
+against DATABASE_URL and reports latency percentiles plus the top plan node.
+
+    python -m benchmarks.product_search --runs 50 --terms "shirt" "SKU-1" "blue sho"
+"""
+
+import argparse
+import json
+import time
+from typing import List
+
+from sqlalchemy import select
+
+from app.api.endpoints.products import SEARCH_MODES, apply_rank, apply_search
+from app.db.session import SessionLocal
+from app.models.product import Product as ProductModel
+from benchmarks.common import summarize
+
+
+def sample_terms(db, count: int) -> List[str]:
+    names = db.query(ProductModel.name).order_by(ProductModel.id).limit(count).all()
+    return [name.split()[0][:4] for (name,) in names if name]
+
+
+def top_plan_node(db, query) -> str:
+    compiled = query.compile(dialect=db.get_bind().dialect)
+    plan = (
+        db.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+        .scalar()
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    node = plan[0]["Plan"]
+    while node.get("Plans") and node["Node Type"] in ("Limit", "Sort", "Gather"):
+        node = node["Plans"][0]
+    return node["Node Type"]
+
+
+def run(terms: List[str], runs: int, limit: int) -> dict:
+    db = SessionLocal()
+    results = {}
+    try:
+        terms = terms or sample_terms(db, 5)
+        for mode in SEARCH_MODES:
+            timings = []
+            plans = set()
+            for term in terms:
+                query = apply_search(select(ProductModel), term, mode)
+                query = apply_rank(query, term, mode == "fulltext").limit(limit)
+                plans.add(top_plan_node(db, query))
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    db.scalars(query).all()
+                    timings.append((time.perf_counter() - started) * 1000)
+            results[mode] = {**summarize(timings), "plans": sorted(plans)}
+    finally:
+        db.close()
+    return {"terms": terms, "runs": runs, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--terms", nargs="*", default=[])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.terms, args.runs, args.limit), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Local stand-ins for the benchmark suite: a scratch postgres database loaded
+from `seed/db_data_dump.sql`, a dedicated redis database and a uvicorn
+process of the app pointed at both.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+import psycopg2
+import redis
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.engine import make_url
+
+ROOT = Path(__file__).resolve().parent.parent
+SEED_FILE = ROOT / "seed" / "db_data_dump.sql"
+
+# every product in the seed gets this much stock, so checkout traffic never
+# turns into a stream of 400s halfway through a run
+SEED_STOCK = 1_000_000
+
+
+def alembic_config(database_url: str) -> Config:
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+    return config
+
+
+def seed_revision(dump: str) -> str:
+    """the alembic revision the data dump was taken at"""
+    match = re.search(r"INSERT INTO public\.alembic_version VALUES \('(\w+)'\)", dump)
+    if not match:
+        raise SystemExit(f"No alembic revision found in {SEED_FILE}")
+    return match.group(1)
+
+
+def recreate_database(database_url: str) -> None:
+    url = make_url(database_url)
+    maintenance = url.set(database="postgres").render_as_string(hide_password=False)
+    connection = psycopg2.connect(maintenance)
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{url.database}" WITH (FORCE)')
+            cursor.execute(f'CREATE DATABASE "{url.database}"')
+    finally:
+        connection.close()
+
+
+def prepare_database(database_url: str) -> None:
+    """
+    Fresh database with the seed data at the current schema. The dump only
+    holds data, so the schema is migrated up to the revision it was taken
+    at, the data loaded, and the remaining migrations backfill from there.
+    """
+    dump = SEED_FILE.read_text()
+    recreate_database(database_url)
+    config = alembic_config(database_url)
+    command.upgrade(config, seed_revision(dump))
+
+    connection = psycopg2.connect(database_url)
+    try:
+        with connection, connection.cursor() as cursor:
+            # the dump brings its own alembic_version row
+            cursor.execute("DELETE FROM alembic_version")
+            cursor.execute(dump)
+    finally:
+        connection.close()
+
+    command.upgrade(config, "head")
+
+    connection = psycopg2.connect(database_url)
+    try:
+        with connection, connection.cursor() as cursor:
+            cursor.execute("UPDATE investory SET quantity = %s", (SEED_STOCK,))
+    finally:
+        connection.close()
+
+
+def reset_redis(redis_url: str) -> None:
+    """empty the benchmark redis database, nothing else on the server"""
+    redis.from_url(redis_url).flushdb()
+
+
+def server_env(overrides: Dict[str, str]) -> Dict[str, str]:
+    env = dict(os.environ)
+    defaults = {
+        "SECRET_KEY": "benchmark-secret-key",
+        "JWT_ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "HTTP_MAX_ATTEMPTS": "1000000",
+        "HTTP_ATTEMPT_COOLDOWN": "60",
+        "KAFKA_TOPIC_ORDER": "bench_orders_event",
+        "KAFKA_TOPIC_SALES": "bench_sales_event",
+        "KAFKA_GROUP_ID": "bench_group",
+        "REDIS_INCOMING_ORDER": "BENCH_INCOMING_ORDER",
+        "REDIS_LOW_INVENTORY": "BENCH_LOW_INVENTORY",
+        "REDIS_QUEUE_ORDER": "BENCH_QUEUE_ORDER",
+        "LOG_LEVEL": "WARNING",
+    }
+    for key, value in defaults.items():
+        env.setdefault(key, value)
+    env.update(overrides)
+    return env
+
+
+class Server:
+    """uvicorn running the app in a child process"""
+
+    def __init__(self, port: int, workers: int, env: Dict[str, str]):
+        self.port = port
+        self.workers = workers
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 60.0) -> None:
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(self.port),
+                "--workers",
+                str(self.workers),
+                "--no-access-log",
+            ],
+            cwd=ROOT,
+            env=self.env,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit("The app exited during startup")
+            try:
+                if httpx.get(self.base_url + "/", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.5)
+        self.stop()
+        raise SystemExit(f"The app did not answer within {timeout} seconds")
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.process = None
@@ -0,0 +1,10 @@
+-- sales events the consumer could not insert even one by one, kept for
+-- inspection so the rest of the topic keeps flowing
+CREATE TABLE sales_dead_letter (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  payload JSONB NOT NULL,
+  error TEXT NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_sales_dead_letter_created_at ON sales_dead_letter(created_at);
+ALTER TABLE sales_dead_letter ENABLE ROW LEVEL SECURITY;
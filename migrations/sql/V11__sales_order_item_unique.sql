@@ -0,0 +1,46 @@
+-- one sales row per order line, so a redelivered sales event is a no-op;
+-- earlier redeliveries may have left duplicates, keep the first of each
+DELETE FROM sales s USING (
+    SELECT id,
+      row_number() OVER (
+        PARTITION BY order_item_id
+        ORDER BY created_at,
+          id
+      ) AS n
+    FROM sales
+  ) d
+WHERE s.id = d.id
+  AND d.n > 1;
+DROP INDEX IF EXISTS idx_sales_order_item;
+ALTER TABLE sales
+ADD CONSTRAINT uq_sales_order_item UNIQUE (order_item_id);
+-- the duplicates were rolled up as well, rebuild the rollups from sales
+DELETE FROM sales_rollup;
+INSERT INTO sales_rollup (
+    grain,
+    period_start,
+    product_id,
+    category_id,
+    channel_id,
+    total_revenue,
+    total_sales
+  )
+SELECT g.grain,
+  date_trunc(g.grain, s.sale_date)::date,
+  s.product_id,
+  s.category_id,
+  s.channel_id,
+  SUM(s.amount),
+  SUM(s.quantity)
+FROM sales s
+  CROSS JOIN (
+    VALUES ('day'),
+      ('week'),
+      ('month'),
+      ('year')
+  ) AS g(grain)
+GROUP BY 1,
+  2,
+  3,
+  4,
+  5;
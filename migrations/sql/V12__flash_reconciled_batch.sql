@@ -0,0 +1,9 @@
+-- flash sale reservation batches already written to inventory, so a batch
+-- retried after a crash between the commit and its removal from redis is
+-- not applied twice
+CREATE TABLE flash_reconciled_batch (
+  batch_id UUID PRIMARY KEY,
+  applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_flash_reconciled_batch_applied_at ON flash_reconciled_batch(applied_at);
+ALTER TABLE flash_reconciled_batch ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,61 @@
+-- deleting a category or channel nulls it in sales, the matching rollup rows
+-- are folded into the rows already keyed on NULL instead of colliding with
+-- them on uq_sales_rollup_key
+CREATE OR REPLACE FUNCTION merge_sales_rollup_category() RETURNS TRIGGER AS $$ BEGIN
+  INSERT INTO sales_rollup (
+      grain,
+      period_start,
+      product_id,
+      category_id,
+      channel_id,
+      total_revenue,
+      total_sales
+    )
+  SELECT grain,
+    period_start,
+    product_id,
+    NULL,
+    channel_id,
+    total_revenue,
+    total_sales
+  FROM sales_rollup
+  WHERE category_id = OLD.id ON CONFLICT ON CONSTRAINT uq_sales_rollup_key DO
+  UPDATE
+  SET total_revenue = sales_rollup.total_revenue + EXCLUDED.total_revenue,
+    total_sales = sales_rollup.total_sales + EXCLUDED.total_sales,
+    updated_at = CURRENT_TIMESTAMP;
+  DELETE FROM sales_rollup
+  WHERE category_id = OLD.id;
+  RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER trg_sales_rollup_category_delete BEFORE DELETE ON category FOR EACH ROW EXECUTE FUNCTION merge_sales_rollup_category();
+CREATE OR REPLACE FUNCTION merge_sales_rollup_channel() RETURNS TRIGGER AS $$ BEGIN
+  INSERT INTO sales_rollup (
+      grain,
+      period_start,
+      product_id,
+      category_id,
+      channel_id,
+      total_revenue,
+      total_sales
+    )
+  SELECT grain,
+    period_start,
+    product_id,
+    category_id,
+    NULL,
+    total_revenue,
+    total_sales
+  FROM sales_rollup
+  WHERE channel_id = OLD.id ON CONFLICT ON CONSTRAINT uq_sales_rollup_key DO
+  UPDATE
+  SET total_revenue = sales_rollup.total_revenue + EXCLUDED.total_revenue,
+    total_sales = sales_rollup.total_sales + EXCLUDED.total_sales,
+    updated_at = CURRENT_TIMESTAMP;
+  DELETE FROM sales_rollup
+  WHERE channel_id = OLD.id;
+  RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER trg_sales_rollup_channel_delete BEFORE DELETE ON sales_channel FOR EACH ROW EXECUTE FUNCTION merge_sales_rollup_channel();
@@ -0,0 +1,54 @@
+-- one sales fact per order line instead of one row per unit sold
+ALTER TABLE sales
+ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1;
+-- amount now holds the line total, widen it like order_items.subtotal
+ALTER TABLE sales
+ALTER COLUMN amount TYPE DECIMAL(14, 4);
+-- compact existing per-unit rows into a single row per order line
+CREATE TEMP TABLE sales_compacted ON COMMIT DROP AS
+SELECT (array_agg(id ORDER BY created_at, id)) [1] AS id,
+  order_id,
+  order_item_id,
+  product_id,
+  category_id,
+  channel_id,
+  MIN(sale_date) AS sale_date,
+  SUM(quantity) AS quantity,
+  SUM(amount) AS amount,
+  MIN(created_at) AS created_at,
+  MAX(updated_at) AS updated_at
+FROM sales
+GROUP BY order_id,
+  order_item_id,
+  product_id,
+  category_id,
+  channel_id;
+DELETE FROM sales;
+INSERT INTO sales (
+    id,
+    order_id,
+    order_item_id,
+    product_id,
+    category_id,
+    channel_id,
+    sale_date,
+    quantity,
+    amount,
+    created_at,
+    updated_at
+  )
+SELECT id,
+  order_id,
+  order_item_id,
+  product_id,
+  category_id,
+  channel_id,
+  sale_date,
+  quantity,
+  amount,
+  created_at,
+  updated_at
+FROM sales_compacted;
+-- Sales indexes
+CREATE INDEX idx_sales_order_item ON sales(order_item_id);
+CREATE INDEX idx_sales_sale_date ON sales(sale_date);
@@ -0,0 +1,60 @@
+-- pre-aggregated revenue per period, maintained by the sales consumer
+CREATE TABLE sales_rollup (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  grain VARCHAR(10) NOT NULL,
+  period_start DATE NOT NULL,
+  product_id UUID NOT NULL,
+  category_id UUID,
+  channel_id UUID,
+  total_revenue DECIMAL(16, 4) NOT NULL DEFAULT 0,
+  total_sales INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT chk_sales_rollup_grain CHECK (grain IN ('day', 'week', 'month', 'year')),
+  CONSTRAINT uq_sales_rollup_key UNIQUE NULLS NOT DISTINCT (
+    grain,
+    period_start,
+    product_id,
+    category_id,
+    channel_id
+  ),
+  CONSTRAINT fk_sales_rollup_product FOREIGN KEY (product_id) REFERENCES product(id) ON DELETE CASCADE,
+  CONSTRAINT fk_sales_rollup_category FOREIGN KEY (category_id) REFERENCES category(id) ON DELETE
+  SET NULL,
+    CONSTRAINT fk_sales_rollup_channel FOREIGN KEY (channel_id) REFERENCES sales_channel(id) ON DELETE
+  SET NULL
+);
+-- Sales rollup indexes
+CREATE INDEX idx_sales_rollup_period ON sales_rollup(grain, period_start);
+CREATE INDEX idx_sales_rollup_product ON sales_rollup(grain, product_id, period_start);
+CREATE INDEX idx_sales_rollup_category ON sales_rollup(grain, category_id, period_start);
+ALTER TABLE sales_rollup ENABLE ROW LEVEL SECURITY;
+-- backfill from the existing sales history
+INSERT INTO sales_rollup (
+    grain,
+    period_start,
+    product_id,
+    category_id,
+    channel_id,
+    total_revenue,
+    total_sales
+  )
+SELECT g.grain,
+  date_trunc(g.grain, s.sale_date)::date,
+  s.product_id,
+  s.category_id,
+  s.channel_id,
+  SUM(s.amount),
+  SUM(s.quantity)
+FROM sales s
+  CROSS JOIN (
+    VALUES ('day'),
+      ('week'),
+      ('month'),
+      ('year')
+  ) AS g(grain)
+GROUP BY 1,
+  2,
+  3,
+  4,
+  5;
@@ -0,0 +1,6 @@
+-- composite indexes backing cursor pagination of the product list,
+-- one per sort key with id as the tie-breaker
+CREATE INDEX idx_product_price_id ON product(price, id);
+CREATE INDEX idx_product_cost_price_id ON product(cost_price, id);
+CREATE INDEX idx_product_name_id ON product(name, id);
+CREATE INDEX idx_product_created_at_id ON product(created_at, id);
@@ -0,0 +1,14 @@
+-- indexed product search: weighted search vector, trigram name matching
+-- and case-insensitive sku prefix lookups
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE product
+ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(sku, '')), 'A') || setweight(to_tsvector('english', coalesce(name, '')), 'B') || setweight(
+      to_tsvector('english', coalesce(description, '')),
+      'C'
+    )
+  ) STORED;
+-- Product search indexes
+CREATE INDEX idx_product_search_vector ON product USING GIN (search_vector);
+CREATE INDEX idx_product_name_trgm ON product USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_product_sku_upper_prefix ON product (upper(sku) text_pattern_ops);
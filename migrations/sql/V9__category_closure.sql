@@ -0,0 +1,66 @@
+-- every (ancestor, descendant) pair of the category tree, each category is
+-- its own ancestor at depth 0
+CREATE TABLE category_closure (
+  ancestor_id UUID NOT NULL,
+  descendant_id UUID NOT NULL,
+  depth INTEGER NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id),
+  CONSTRAINT fk_category_closure_ancestor FOREIGN KEY (ancestor_id) REFERENCES category(id) ON DELETE CASCADE,
+  CONSTRAINT fk_category_closure_descendant FOREIGN KEY (descendant_id) REFERENCES category(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_category_closure_descendant ON category_closure(descendant_id, ancestor_id);
+ALTER TABLE category_closure ENABLE ROW LEVEL SECURITY;
+-- the category table is small, so any change to the hierarchy rebuilds the
+-- whole closure once per statement
+CREATE OR REPLACE FUNCTION rebuild_category_closure() RETURNS TRIGGER AS $$ BEGIN
+  -- serialize concurrent rebuilds, the second one waits and sees the first
+  LOCK TABLE category_closure IN EXCLUSIVE MODE;
+  DELETE FROM category_closure;
+  INSERT INTO category_closure (ancestor_id, descendant_id, depth) WITH RECURSIVE tree AS (
+      SELECT id AS ancestor_id,
+        id AS descendant_id,
+        0 AS depth,
+        ARRAY [id] AS path
+      FROM category
+      UNION ALL
+      SELECT t.ancestor_id,
+        c.id,
+        t.depth + 1,
+        t.path || c.id
+      FROM tree t
+        JOIN category c ON c.parent_id = t.descendant_id
+      WHERE NOT c.id = ANY(t.path)
+    )
+  SELECT ancestor_id,
+    descendant_id,
+    depth
+  FROM tree;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER trg_category_closure
+AFTER
+INSERT
+  OR DELETE
+  OR
+UPDATE OF parent_id ON category FOR EACH STATEMENT EXECUTE FUNCTION rebuild_category_closure();
+-- initial fill
+INSERT INTO category_closure (ancestor_id, descendant_id, depth) WITH RECURSIVE tree AS (
+    SELECT id AS ancestor_id,
+      id AS descendant_id,
+      0 AS depth,
+      ARRAY [id] AS path
+    FROM category
+    UNION ALL
+    SELECT t.ancestor_id,
+      c.id,
+      t.depth + 1,
+      t.path || c.id
+    FROM tree t
+      JOIN category c ON c.parent_id = t.descendant_id
+    WHERE NOT c.id = ANY(t.path)
+  )
+SELECT ancestor_id,
+  descendant_id,
+  depth
+FROM tree;
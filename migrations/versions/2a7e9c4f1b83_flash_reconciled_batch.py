@@ -0,0 +1,38 @@
+"""flash reconciled batch
+
+Revision ID: 2a7e9c4f1b83
+Revises: 8f1c3e7b2d64
+Create Date: 2026-10-18 21:26:51.730442
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2a7e9c4f1b83"
+down_revision: Union[str, None] = "8f1c3e7b2d64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V12__flash_reconciled_batch.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
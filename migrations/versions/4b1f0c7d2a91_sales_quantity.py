@@ -0,0 +1,38 @@
+"""sales quantity
+
+Revision ID: 4b1f0c7d2a91
+Revises: 9c2ce1b8e442
+Create Date: 2026-10-18 10:12:41.512377
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4b1f0c7d2a91"
+down_revision: Union[str, None] = "9c2ce1b8e442"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V5__sales_quantity.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
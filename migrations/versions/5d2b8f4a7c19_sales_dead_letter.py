@@ -0,0 +1,38 @@
+"""sales dead letter
+
+Revision ID: 5d2b8f4a7c19
+Revises: a4d82c6f1e37
+Create Date: 2026-10-18 19:12:44.918203
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2b8f4a7c19"
+down_revision: Union[str, None] = "a4d82c6f1e37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V10__sales_dead_letter.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
@@ -0,0 +1,38 @@
+"""sales rollup merge on delete
+
+Revision ID: 6c3d9a1e5f27
+Revises: 2a7e9c4f1b83
+Create Date: 2026-10-18 22:04:13.518296
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6c3d9a1e5f27"
+down_revision: Union[str, None] = "2a7e9c4f1b83"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V13__sales_rollup_merge_on_delete.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
@@ -0,0 +1,38 @@
+"""sales rollup
+
+Revision ID: 7e3d9a5c1f08
+Revises: 4b1f0c7d2a91
+Create Date: 2026-10-18 10:48:03.227614
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7e3d9a5c1f08"
+down_revision: Union[str, None] = "4b1f0c7d2a91"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V6__sales_rollup.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
@@ -0,0 +1,38 @@
+"""sales order item unique
+
+Revision ID: 8f1c3e7b2d64
+Revises: 5d2b8f4a7c19
+Create Date: 2026-10-18 21:03:27.504118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8f1c3e7b2d64"
+down_revision: Union[str, None] = "5d2b8f4a7c19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V11__sales_order_item_unique.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
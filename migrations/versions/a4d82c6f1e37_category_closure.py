@@ -0,0 +1,38 @@
+"""category closure
+
+Revision ID: a4d82c6f1e37
+Revises: e19b7f3a6c25
+Create Date: 2026-10-18 15:41:07.352611
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d82c6f1e37"
+down_revision: Union[str, None] = "e19b7f3a6c25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V9__category_closure.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
@@ -0,0 +1,38 @@
+"""product keyset indexes
+
+Revision ID: c58a2e6b93d4
+Revises: 7e3d9a5c1f08
+Create Date: 2026-10-18 11:31:17.904412
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c58a2e6b93d4"
+down_revision: Union[str, None] = "7e3d9a5c1f08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V7__product_keyset_indexes.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
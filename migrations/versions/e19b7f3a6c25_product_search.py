@@ -0,0 +1,38 @@
+"""product search
+
+Revision ID: e19b7f3a6c25
+Revises: c58a2e6b93d4
+Create Date: 2026-10-18 12:05:52.118930
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e19b7f3a6c25"
+down_revision: Union[str, None] = "c58a2e6b93d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _read_sql_file(filename: str):
+    """Read SQL from a file"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sql_dir = os.path.join(directory, "../sql")
+    with open(os.path.join(sql_dir, filename), "r") as f:
+        return f.read()
+
+
+def upgrade() -> None:
+    # execute sql
+    op.execute(_read_sql_file("V8__product_search.sql"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass